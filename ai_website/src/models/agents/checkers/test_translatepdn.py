@@ -0,0 +1,47 @@
+import re
+from io import StringIO
+from random import Random
+
+from translatepdn import format_pdn_game, initial_state, read_pdn_games, read_pdn_positions
+
+
+def random_game(seed: int, plies: int = 30) -> list:
+    rng = Random(seed)
+    state = initial_state()
+    moves = []
+    for _ in range(plies):
+        legal = state.generate_potential_moves()
+        if not legal:
+            break
+        moves.append(rng.choice(legal))
+        state = state.process_move(moves[-1])
+    return moves
+
+
+SPACED_GAME = format_pdn_game(random_game(7), '1-0', {'Event': 'Glued'})
+# "1. 11-15" written as "1.11-15"
+GLUED_GAME = re.sub(r'(\d+\.) ', r'\1', SPACED_GAME)
+
+
+def test_glued_move_numbers_match_spaced():
+    spaced = list(read_pdn_games(StringIO(SPACED_GAME)))
+    glued = list(read_pdn_games(StringIO(GLUED_GAME)))
+    assert glued == spaced
+    assert re.search(r'\d\.\d', GLUED_GAME)
+    assert len(glued[0][1]) == len(random_game(7))
+
+
+def test_glued_move_numbers_replay():
+    positions = list(read_pdn_positions(StringIO(GLUED_GAME)))
+    assert [str(x[1]) for x in positions] == [str(x) for x in random_game(7)]
+    assert all(x[2] == '1-0' for x in positions)
+
+
+def test_glued_black_move_number_after_setup():
+    # White to move out of a setup position, numbered 1... and glued to the jump
+    game = '[FEN "W:W18:B14"]\n\n1...18x9 0-1\n'
+    [(headers, tokens, result)] = read_pdn_games(StringIO(game))
+    assert tokens == ['18x9']
+    assert result == '0-1'
+    [(position, move, _)] = read_pdn_positions(StringIO(game))
+    assert move.captured
@@ -0,0 +1,235 @@
+from __future__ import annotations
+from typing import Callable, Optional
+
+import numpy as np
+
+from translatemain import SQUARE_CODE_BITS, SQUARE_CODE_PIECES, BoardGeometry, CheckersMove, CheckersState, CheckersPlayer, get_board_geometry
+
+# plane order of a stacked batch, shape (N, 4, rows, cols)
+PLANE_BOTTOM_MEN = 0
+PLANE_BOTTOM_KINGS = 1
+PLANE_TOP_MEN = 2
+PLANE_TOP_KINGS = 3
+
+# (row, col) steps of the four diagonals
+DIAGONAL_STEPS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# the row step men of each player move in (BOTTOM moves towards row 0)
+BOTTOM_FORWARD_ROW = -1
+TOP_FORWARD_ROW = 1
+
+
+def stack_states(states: list[CheckersState]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs states of the same board size into arrays for `batch_generate_heuristic`
+
+    Arguments:
+        states (list[CheckersState]): The positions to stack
+
+    Returns:
+        (planes, turns, move_counts), int8 planes of shape (N, 4, rows, cols), the player to move (0 BOTTOM, 1 TOP)
+        and len(state.moves) of each state (the scalar mobility term)
+    """
+    rows, cols = states[0].rows, states[0].cols
+    geometry = states[0].geometry
+    byte_count = (geometry.num_squares + 7) // 8
+
+    packed = b''.join(bitboard.to_bytes(byte_count, 'little') for each_state in states for bitboard in (
+        each_state.bottom_men, each_state.bottom_kings, each_state.top_men, each_state.top_kings))
+    square_bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8).reshape(len(states) * 4, byte_count),
+                                axis=1, bitorder='little')[:, :geometry.num_squares]
+
+    planes = np.zeros((len(states) * 4, rows * cols), dtype=np.int8)
+    planes[:, square_cells(geometry)] = square_bits
+    turns = np.fromiter((0 if x.turn == CheckersPlayer.BOTTOM else 1 for x in states),
+                        dtype=np.int8, count=len(states))
+    move_counts = np.fromiter((len(x.moves) for x in states),
+                              dtype=np.int64, count=len(states))
+    return planes.reshape(len(states), 4, rows, cols), turns, move_counts
+
+
+def planes_from_buffer(buffer: bytes | memoryview, rows: int = 8, cols: int = 8) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The planes and turns of `stack_states` straight from an `encode_states` buffer, without creating a CheckersState
+    (or any other Python object) per position
+
+    Arguments:
+        buffer (bytes | memoryview): Positions encoded with CheckersState.to_bytes, back to back
+        rows (int): The # of rows in the board
+        cols (int): The # of columns in the board
+
+    Returns:
+        (planes, turns), int8 planes of shape (N, 4, rows, cols) and the player to move (0 BOTTOM, 1 TOP)
+    """
+    geometry = get_board_geometry(rows, cols)
+    view = memoryview(buffer).cast('B')
+    if len(view) % geometry.encoded_size:
+        raise ValueError(
+            f'A buffer of {rows}x{cols} positions is a multiple of {geometry.encoded_size} bytes, got {len(view)}')
+    records = np.frombuffer(view, dtype=np.uint8).reshape(-1, geometry.encoded_size)
+    bits = np.unpackbits(records, axis=1, bitorder='little')
+    turns = bits[:, 0].astype(np.int8)
+    code_bits = bits[:, 1:1 + SQUARE_CODE_BITS * geometry.num_squares].reshape(
+        len(records), geometry.num_squares, SQUARE_CODE_BITS)
+    codes = (code_bits << np.arange(SQUARE_CODE_BITS, dtype=np.uint8)).sum(axis=2)
+    # the same check as CheckersState.from_bytes, codes past SQUARE_CODE_PIECES are corrupt
+    invalid = np.argwhere(codes > len(SQUARE_CODE_PIECES))
+    if len(invalid):
+        position, index = invalid[0]
+        raise ValueError(f'Invalid square code {codes[position, index]} at square {index} of position {position}')
+
+    planes = np.zeros((len(records), 4, rows * cols), dtype=np.int8)
+    # code n is plane n - 1, the SQUARE_CODE_PIECES order matches the PLANE_* order
+    planes[:, :, square_cells(geometry)] = codes[:, None, :] == np.arange(
+        1, 5, dtype=codes.dtype)[None, :, None]
+    return planes.reshape(len(records), 4, rows, cols), turns
+
+
+def square_cells(geometry: BoardGeometry) -> np.ndarray:
+    # flat (row * cols + col) cell of every bitboard square
+    return np.array([y * geometry.cols + x for (x, y) in geometry.square_coords], dtype=np.intp)
+
+
+def piece_value_planes(geometry: BoardGeometry) -> np.ndarray:
+    # BoardGeometry.piece_values laid out as (side, is_king, rows, cols) planes
+    values = np.zeros((2, 2, geometry.rows * geometry.cols), dtype=np.int64)
+    values[:, :, square_cells(geometry)] = np.array(
+        geometry.piece_values, dtype=np.int64)
+    return values.reshape(2, 2, geometry.rows, geometry.cols)
+
+
+def shift(planes: np.ndarray, step_row: int, step_col: int) -> np.ndarray:
+    # result[..., r, c] = planes[..., r + step_row, c + step_col], zero where that falls off the board
+    rows, cols = planes.shape[-2:]
+    shifted = np.zeros_like(planes)
+    shifted[..., max(0, -step_row):rows - max(0, step_row), max(0, -step_col):cols - max(0, step_col)] = \
+        planes[..., max(0, step_row):rows - max(0, -step_row), max(0, step_col):cols - max(0, -step_col)]
+    return shifted
+
+
+def side_heuristic(own_men: np.ndarray, own_kings: np.ndarray, enemy_men: np.ndarray, enemy_kings: np.ndarray, own_forward_row: int, own_values: np.ndarray, move_counts: Optional[np.ndarray]) -> np.ndarray:
+    """
+    CheckersState.generate_heuristic for every position, scored for the player owning `own_men`/`own_kings`
+
+    Arguments:
+        own_men (np.ndarray): Boolean (N, rows, cols) planes of the scored player's men
+        own_kings (np.ndarray): Boolean planes of the scored player's kings
+        enemy_men (np.ndarray): Boolean planes of the opponent's men
+        enemy_kings (np.ndarray): Boolean planes of the opponent's kings
+        own_forward_row (int): The row step the scored player's men move in
+        own_values (np.ndarray): The (is_king, rows, cols) piece values of the scored player
+        move_counts (Optional[np.ndarray]): The mobility term, counted from the planes when None
+
+    Returns:
+        The N heuristic values
+    """
+    own = own_men | own_kings
+    enemy = enemy_men | enemy_kings
+    empty = ~(own | enemy)
+    enemy_forward_row = -own_forward_row
+    sum_axes = (1, 2)
+
+    # Mobility, the jumps when there are any (captures are mandatory) and the steps otherwise, men forwards only. Each
+    # first jump counts once, so this is only an estimate where jump sequences chain or branch
+    if move_counts is None:
+        steps = np.zeros(own.shape[0], dtype=np.int64)
+        jumps = np.zeros(own.shape[0], dtype=np.int64)
+        for (step_row, step_col) in DIAGONAL_STEPS:
+            movers = own_kings | own_men if step_row == own_forward_row else own_kings
+            steps += (movers & shift(empty, step_row,
+                      step_col)).sum(sum_axes)
+            jumps += (movers & shift(enemy, step_row, step_col) &
+                      shift(empty, 2 * step_row, 2 * step_col)).sum(sum_axes)
+        mobility = np.where(jumps > 0, jumps, steps)
+    else:
+        mobility = move_counts.astype(np.int64)
+
+    # Threat Assessment, Safety and Forced jumps, see CheckersState.square_threats
+    on_board = np.ones(own.shape[-2:], dtype=bool)
+    square_vulnerable = np.zeros(own.shape, dtype=np.int64)
+    safe = np.zeros(own.shape[0], dtype=np.int64)
+    for (step_row, step_col) in DIAGONAL_STEPS:
+        # the attacker sits on this diagonal and jumps the other way
+        attackers = enemy_kings | enemy_men if -step_row == enemy_forward_row else enemy_kings
+        threatened = own & shift(attackers, step_row, step_col) & shift(
+            on_board, -step_row, -step_col)
+        landing_taken = ~shift(empty, -step_row, -step_col)
+        square_vulnerable += threatened & ~landing_taken
+        safe += (threatened & landing_taken).sum(sum_axes)
+    vulnerable = square_vulnerable.sum(sum_axes)
+    forced = (square_vulnerable > 0).sum(sum_axes)
+
+    # Board Control
+    control = own.sum(sum_axes, dtype=np.int64) - \
+        enemy.sum(sum_axes, dtype=np.int64)
+
+    # Material Count, King's Position, Control of the Center
+    piece_values = (own_men * own_values[0]).sum(sum_axes) + \
+        (own_kings * own_values[1]).sum(sum_axes)
+
+    return mobility - vulnerable + safe + forced + control + piece_values
+
+
+def batch_generate_heuristic(planes: np.ndarray, turns: np.ndarray, move_counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Vectorized CheckersState.generate_heuristic over a stack of positions of the same board size
+
+    Given the arrays from `stack_states`, the result matches calling generate_heuristic on each state exactly. Without
+    `move_counts`, mobility is counted from the planes, which equals the scalar value once generate_potential_moves
+    has run on the state unless a jump can be continued (see side_heuristic)
+
+    Arguments:
+        planes (np.ndarray): int8 planes of shape (N, 4, rows, cols), see the PLANE_* constants
+        turns (np.ndarray): The player to move in each position (0 BOTTOM, 1 TOP)
+        move_counts (Optional[np.ndarray]): The mobility term of each position
+
+    Returns:
+        The N heuristic values (int64), each from the perspective of the player to move
+    """
+    rows, cols = planes.shape[-2:]
+    values = piece_value_planes(get_board_geometry(rows, cols))
+    pieces = planes.astype(bool)
+    bottom_men, bottom_kings = pieces[:, PLANE_BOTTOM_MEN], pieces[:, PLANE_BOTTOM_KINGS]
+    top_men, top_kings = pieces[:, PLANE_TOP_MEN], pieces[:, PLANE_TOP_KINGS]
+
+    bottom_scores = side_heuristic(
+        bottom_men, bottom_kings, top_men, top_kings, BOTTOM_FORWARD_ROW, values[0], move_counts)
+    top_scores = side_heuristic(
+        top_men, top_kings, bottom_men, bottom_kings, TOP_FORWARD_ROW, values[1], move_counts)
+    return np.where(np.asarray(turns) == 0, bottom_scores, top_scores)
+
+
+def evaluate_states(states: list[CheckersState]) -> list[int]:
+    # drop-in batch evaluator for sort_states_by_heuristic
+    if not states:
+        return []
+    return batch_generate_heuristic(*stack_states(states)).tolist()
+
+
+def evaluate_children(state: CheckersState) -> tuple[list[CheckersMove], np.ndarray]:
+    # every move of the position with the heuristic of the state it leads to, in one call
+    moves = state.generate_potential_moves()
+    if not moves:
+        return moves, np.zeros(0, dtype=np.int64)
+    return moves, batch_generate_heuristic(*stack_states(state.process_moves()))
+
+
+def softmax_policy(temperature: float = 10.0) -> Callable[[CheckersState, list[CheckersMove]], list[float]]:
+    """
+    Vectorized OpponentModel.SOFTMAX for expectimax_search(opponent=OpponentModel.POLICY), scoring every reply in one
+    batch instead of one make/unmake per move
+
+    Arguments:
+        temperature (float): The softmax temperature
+
+    Returns:
+        The policy, giving the probability of each move
+    """
+    def policy(state: CheckersState, moves: list[CheckersMove]) -> list[float]:
+        # the opponent prefers positions that are bad for the player moving after it
+        scores = -batch_generate_heuristic(
+            *stack_states([state.process_move(x) for x in moves])).astype(np.float64)
+        weights = np.exp((scores - scores.max()) / temperature)
+        return (weights / weights.sum()).tolist()
+
+    return policy
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import argparse
+import json
+import sys
+from time import perf_counter
+from typing import Callable
+
+from translatemain import CheckersState, TranspositionTable, search_best_move
+
+# Fixed positions as CheckersState.pack tuples (rows, cols, turn 0 BOTTOM / 1 TOP, bottom men, bottom kings, top men,
+# top kings), taken from seeded random games so every run measures exactly the same work
+CORPUS: dict[str, list[tuple[int, int, int, int, int, int, int]]] = {
+    'opening': [
+        (8, 8, 1, 4293918720, 0, 4095, 0),
+        (8, 8, 1, 4281991168, 0, 8159, 0),
+        (8, 8, 1, 4260495360, 0, 8175, 0),
+        (8, 8, 1, 4260626432, 0, 12255, 0),
+    ],
+    'middlegame': [
+        (8, 8, 1, 2553286656, 0, 263023, 16384),
+        (8, 8, 1, 2635595776, 0, 4205469, 536870912),
+        (8, 8, 1, 3105357824, 0, 51262, 0),
+        (8, 8, 1, 3644391680, 0, 33608335, 0),
+    ],
+    'kings': [
+        (8, 8, 1, 2156920832, 2, 1028, 1879048192),
+        (8, 8, 1, 336592896, 2299002880, 4196628, 536879753),
+        (8, 8, 1, 672137216, 2433220608, 34836, 16426),
+        (8, 8, 1, 2290352128, 306315264, 8520, 1188),
+    ],
+    'endgame': [
+        (8, 8, 1, 2048, 512, 35656704, 1048576),
+        (8, 8, 1, 0, 1024, 4263954, 67108864),
+        (8, 8, 1, 134217728, 512, 2621456, 1074790400),
+        (8, 8, 1, 0, 16, 33555456, 335544320),
+    ],
+}
+
+DEFAULT_DEPTHS = [4, 5, 6]
+# a benchmark slower than the baseline by more than this fraction counts as a regression
+REGRESSION_THRESHOLD = 0.10
+# each microbenchmark repeats its pass over the corpus for at least this long
+MIN_SECONDS = 0.5
+
+
+def load_corpus(categories: list[str]) -> list[CheckersState]:
+    return [CheckersState.unpack(x) for each_category in categories for x in CORPUS[each_category]]
+
+
+def time_operation(operation: Callable[[CheckersState], object], states: list[CheckersState], min_seconds: float = MIN_SECONDS) -> dict:
+    # calls `operation` on every state, over and over until `min_seconds` have passed
+    operations = 0
+    started = perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for each_state in states:
+            operation(each_state)
+        operations += len(states)
+        elapsed = perf_counter() - started
+    return {'operations': operations, 'seconds': elapsed, 'ops_per_second': operations / elapsed}
+
+
+def time_search(states: list[CheckersState], depth: int, min_seconds: float = MIN_SECONDS) -> dict:
+    # every position searched to `depth` with a fresh table, passes repeated until `min_seconds` have passed. The
+    # node count of one pass doubles as a behaviour check
+    nodes = 0
+    passes = 0
+    started = perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds or passes == 0:
+        nodes = sum(search_best_move(x, depth, TranspositionTable()).nodes for x in states)
+        passes += 1
+        elapsed = perf_counter() - started
+    return {'nodes': nodes, 'passes': passes, 'seconds': elapsed, 'nodes_per_second': nodes * passes / elapsed}
+
+
+def run_benchmarks(categories: list[str], depths: list[int], min_seconds: float = MIN_SECONDS) -> dict[str, dict]:
+    """
+    Microbenchmarks of the state operations followed by full searches, all over the same corpus
+
+    Arguments:
+        categories (list[str]): The CORPUS categories to use
+        depths (list[int]): The search depths to run
+        min_seconds (float): The least time spent on each microbenchmark
+
+    Returns:
+        The measurements keyed by benchmark name, 'ops_per_second' for the operations and 'nodes_per_second' (and
+        'nodes') for the searches
+    """
+    states = load_corpus(categories)
+    first_moves = {id(x): x.generate_potential_moves()[0] for x in states}
+    results: dict[str, dict] = {
+        'generate_potential_moves': time_operation(lambda x: x.generate_potential_moves(), states, min_seconds),
+        'process_move': time_operation(lambda x: x.process_move(first_moves[id(x)]), states, min_seconds),
+        'clone': time_operation(lambda x: x.clone(), states, min_seconds),
+        'generate_heuristic': time_operation(lambda x: x.generate_heuristic(), states, min_seconds),
+    }
+    for each_depth in depths:
+        results[f'search_depth_{each_depth}'] = time_search(
+            states, each_depth, min_seconds)
+    return results
+
+
+def compare_results(current: dict[str, dict], baseline: dict[str, dict], threshold: float = REGRESSION_THRESHOLD) -> tuple[list[str], bool]:
+    """
+    Compares the rate of every benchmark found in both runs
+
+    Arguments:
+        current (dict[str, dict]): The results of this run
+        baseline (dict[str, dict]): The saved results
+        threshold (float): The slowdown fraction that counts as a regression
+
+    Returns:
+        A report line per benchmark, and whether any benchmark regressed or searched a different amount of nodes
+    """
+    lines: list[str] = []
+    regressed = False
+    for (name, measured) in current.items():
+        if name not in baseline:
+            continue
+        rate_key = 'ops_per_second' if 'ops_per_second' in measured else 'nodes_per_second'
+        ratio = measured[rate_key] / baseline[name][rate_key]
+        status = 'ok'
+        if ratio < 1 - threshold:
+            status = 'REGRESSION'
+            regressed = True
+        if 'nodes' in measured and measured['nodes'] != baseline[name]['nodes']:
+            # a different tree was searched, the rates are not comparable
+            status = f'NODES CHANGED ({baseline[name]["nodes"]} -> {measured["nodes"]})'
+            regressed = True
+        lines.append(
+            f'{name:<28}{baseline[name][rate_key]:>14.0f}{measured[rate_key]:>14.0f}{ratio:>9.2f}x  {status}')
+    return lines, regressed
+
+
+def parse_depths(depths: str) -> list[int]:
+    # "4-10" or "4,6,8"
+    if '-' in depths:
+        low, high = depths.split('-')
+        return list(range(int(low), int(high) + 1))
+    return [int(x) for x in depths.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks move generation, evaluation and search over a fixed corpus of positions')
+    parser.add_argument('--categories', default=','.join(CORPUS),
+                        help=f'Comma separated corpus categories ({", ".join(CORPUS)})')
+    parser.add_argument('--depths', default=','.join(str(x) for x in DEFAULT_DEPTHS),
+                        help='The search depths, e.g. 4-10 or 4,6,8')
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS)
+    parser.add_argument('--save', help='Writes the results to this baseline file')
+    parser.add_argument('--compare', help='Compares the results against this baseline file')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.categories.split(','), parse_depths(arguments.depths),
+                             arguments.min_seconds)
+    for (benchmark_name, benchmark) in results.items():
+        if 'ops_per_second' in benchmark:
+            print(f'{benchmark_name:<28}{benchmark["ops_per_second"]:>14.0f} ops/s')
+        else:
+            print(f'{benchmark_name:<28}{benchmark["nodes_per_second"]:>14.0f} nodes/s '
+                  f'({benchmark["nodes"]} nodes per pass, {benchmark["passes"]} passes in {benchmark["seconds"]:.2f}s)')
+
+    if arguments.save:
+        with open(arguments.save, 'w', encoding='utf-8') as baseline_file:
+            json.dump(results, baseline_file, indent=4)
+
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            report, any_regressed = compare_results(
+                results, json.load(baseline_file), arguments.threshold)
+        print(f'\n{"benchmark":<28}{"baseline":>14}{"current":>14}{"ratio":>10}')
+        print('\n'.join(report))
+        sys.exit(1 if any_regressed else 0)
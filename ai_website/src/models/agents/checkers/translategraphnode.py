@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Optional, List, Any, TypeVar
+from typing import Optional, List, Any, TypeVar, Iterator
+from array import array
 
 from enum import Enum
 
@@ -11,36 +12,222 @@ class GraphNodeType(Enum):
     TERMINAL = 4
 
 
+# GraphArena stores node types as their index in this list
+GRAPH_NODE_TYPES = list(GraphNodeType)
+GRAPH_NODE_TYPE_CODES = {x: ind for ind, x in enumerate(GRAPH_NODE_TYPES)}
+
+
 class GraphNode:
+    __slots__ = ('_value', '_spec', '_cached_value', 'children', 'parent')
+
     def __init__(self: GraphNode, value: int = -1) -> None:
-        self.value = value
-        self.spec: GraphNodeType = GraphNodeType.TERMINAL
+        self._value = value
+        self._spec: GraphNodeType = GraphNodeType.TERMINAL
+        # get_value of a non-terminal node, None until computed or after the subtree changed
+        self._cached_value: Optional[int] = None
         self.children: List[GraphNode] = []
         self.parent: Optional[GraphNode] = None
 
+    @property
+    def value(self: GraphNode) -> int:
+        return self._value
+
+    @value.setter
+    def value(self: GraphNode, value: int) -> None:
+        self._value = value
+        self.invalidate()
+
+    @property
+    def spec(self: GraphNode) -> GraphNodeType:
+        return self._spec
+
+    @spec.setter
+    def spec(self: GraphNode, spec: GraphNodeType) -> None:
+        self._spec = spec
+        self.invalidate()
+
+    def invalidate(self: GraphNode) -> None:
+        # a cached node always has cached (or terminal) children, so the walk up stops at the first stale ancestor
+        self._cached_value = None
+        curr_node = self.parent
+        while curr_node is not None and curr_node._cached_value is not None:
+            curr_node._cached_value = None
+            curr_node = curr_node.parent
+
     def add_child(self: GraphNode, child: GraphNode) -> GraphNode:
+        child.parent = self
         self.children.append(child)
+        self.invalidate()
         return self
 
     def add_children(self: GraphNode, children: List[GraphNode]) -> GraphNode:
         for each_child in children:
+            each_child.parent = self
             self.children.append(each_child)
+        self.invalidate()
         return self
 
     def get_value(self: GraphNode) -> int:
-        if self.spec == GraphNodeType.TERMINAL:
-            return self.value
-        if self.spec == GraphNodeType.MIN:
-            return min(x.get_value() for x in self.children)
-        if self.spec == GraphNodeType.MAX:
-            return max(x.get_value() for x in self.children)
-        if self.spec == GraphNodeType.EXPECTIMAX:
-            return sum(x.get_value() for x in self.children) // len(self.children)
-        return 0
+        # post-order over an explicit stack, only visiting the nodes whose cached value is stale
+        if self._spec == GraphNodeType.TERMINAL:
+            return self._value
+        if self._cached_value is not None:
+            return self._cached_value
+
+        pending: List[tuple[GraphNode, bool]] = [(self, False)]
+        while pending:
+            curr_node, expanded = pending.pop()
+            if not expanded:
+                pending.append((curr_node, True))
+                pending.extend((x, False) for x in curr_node.children
+                               if x._spec != GraphNodeType.TERMINAL and x._cached_value is None)
+                continue
+
+            child_values = [x._value if x._spec == GraphNodeType.TERMINAL else x._cached_value
+                            for x in curr_node.children]
+            if curr_node._spec == GraphNodeType.MIN:
+                curr_node._cached_value = min(child_values)
+            elif curr_node._spec == GraphNodeType.MAX:
+                curr_node._cached_value = max(child_values)
+            elif curr_node._spec == GraphNodeType.EXPECTIMAX:
+                curr_node._cached_value = sum(
+                    child_values) // len(child_values)
+            else:
+                curr_node._cached_value = 0
+        return self._cached_value
+
+    def copy_node(self: GraphNode) -> GraphNode:
+        # copy of this node alone, without children or parent (subclasses copy their own fields)
+        copied = GraphNode(self._value)
+        copied._spec = self._spec
+        copied._cached_value = self._cached_value
+        return copied
 
     def clone(self: GraphNode) -> GraphNode:
-        cloned = GraphNode(self.value)
-        cloned.spec = self.spec
-        cloned.children = [x.clone() for x in self.children]
-        cloned.parent = self.parent.clone() if self.parent is not None else None
+        """
+        Copies the subtree rooted at this node without recursion. The ancestors are shared rather than copied, the
+        clone points at the same parent (which does not list it as a child)
+
+        Arguments:
+            self (GraphNode): The subtree root
+
+        Returns:
+            The cloned subtree root
+        """
+        cloned = self.copy_node()
+        cloned.parent = self.parent
+        pending: List[tuple[GraphNode, GraphNode]] = [(self, cloned)]
+        while pending:
+            curr_node, curr_clone = pending.pop()
+            for each_child in curr_node.children:
+                child_clone = each_child.copy_node()
+                child_clone.parent = curr_clone
+                curr_clone.children.append(child_clone)
+                pending.append((each_child, child_clone))
         return cloned
+
+
+class GraphArena:
+    """
+    Compact store for a whole tree, one row of parallel typed arrays per node instead of one GraphNode object. Nodes
+    are int ids, children are linked through first_children/next_siblings (-1 for none), and moves hold an integer key
+    of the move leading to the node (e.g. its index among the moves of the parent), 21 bytes per node in total
+
+    Arguments:
+        self (GraphArena): The internal state
+
+    Returns:
+        Created instance
+    """
+    __slots__ = ('specs', 'values', 'first_children', 'next_siblings', 'moves')
+
+    def __init__(self: GraphArena) -> None:
+        self.specs = array('b')
+        self.values = array('q')
+        self.first_children = array('i')
+        self.next_siblings = array('i')
+        self.moves = array('I')
+
+    def __len__(self: GraphArena) -> int:
+        return len(self.specs)
+
+    def nbytes(self: GraphArena) -> int:
+        # memory held by the columns
+        return sum(x.itemsize * len(x) for x in (self.specs, self.values, self.first_children, self.next_siblings, self.moves))
+
+    def add_node(self: GraphArena, spec: GraphNodeType = GraphNodeType.TERMINAL, value: int = -1, move: int = 0) -> int:
+        self.specs.append(GRAPH_NODE_TYPE_CODES[spec])
+        self.values.append(value)
+        self.first_children.append(-1)
+        self.next_siblings.append(-1)
+        self.moves.append(move)
+        return len(self.specs) - 1
+
+    def add_child(self: GraphArena, node: int, child: int) -> GraphArena:
+        return self.add_children(node, [child])
+
+    def add_children(self: GraphArena, node: int, children: List[int]) -> GraphArena:
+        if not children:
+            return self
+        for (each_child, next_child) in zip(children, children[1:]):
+            self.next_siblings[each_child] = next_child
+        # append after the existing children, keeping their order
+        last_child = self.first_children[node]
+        if last_child == -1:
+            self.first_children[node] = children[0]
+            return self
+        while self.next_siblings[last_child] != -1:
+            last_child = self.next_siblings[last_child]
+        self.next_siblings[last_child] = children[0]
+        return self
+
+    def children(self: GraphArena, node: int) -> Iterator[int]:
+        curr_child = self.first_children[node]
+        while curr_child != -1:
+            yield curr_child
+            curr_child = self.next_siblings[curr_child]
+
+    def get_spec(self: GraphArena, node: int) -> GraphNodeType:
+        return GRAPH_NODE_TYPES[self.specs[node]]
+
+    def set_spec(self: GraphArena, node: int, spec: GraphNodeType) -> None:
+        self.specs[node] = GRAPH_NODE_TYPE_CODES[spec]
+
+    def get_value(self: GraphArena, node: int) -> int:
+        # GraphNode.get_value for the subtree rooted at `node`
+        spec = GRAPH_NODE_TYPES[self.specs[node]]
+        if spec == GraphNodeType.TERMINAL:
+            return self.values[node]
+        if spec == GraphNodeType.MIN:
+            return min(self.get_value(x) for x in self.children(node))
+        if spec == GraphNodeType.MAX:
+            return max(self.get_value(x) for x in self.children(node))
+        if spec == GraphNodeType.EXPECTIMAX:
+            child_values = [self.get_value(x) for x in self.children(node)]
+            return sum(child_values) // len(child_values)
+        return 0
+
+    def alphabeta(self: GraphArena, node: int, alpha: float = float('-inf'), beta: float = float('inf')) -> float:
+        # alphabeta_pruning for the subtree rooted at `node`
+        spec = GRAPH_NODE_TYPES[self.specs[node]]
+        if spec == GraphNodeType.TERMINAL:
+            return self.values[node]
+
+        if spec == GraphNodeType.MAX:
+            curr_value = float('-inf')
+            for each_ab_child in self.children(node):
+                curr_value = max(curr_value, self.alphabeta(
+                    each_ab_child, alpha, beta))
+                if curr_value > beta:
+                    break
+                alpha = max(alpha, curr_value)
+            return curr_value
+
+        curr_value = float('inf')
+        for each_ab_child in self.children(node):
+            curr_value = min(curr_value, self.alphabeta(
+                each_ab_child, alpha, beta))
+            if curr_value < alpha:
+                break
+            beta = min(curr_value, beta)
+        return curr_value
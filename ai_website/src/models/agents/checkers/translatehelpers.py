@@ -0,0 +1,189 @@
+from __future__ import annotations
+import json
+import os
+from functools import wraps
+from time import perf_counter, time
+from typing import Callable, Optional, TextIO
+
+# Set to 1 before translatemain is imported to time the search phases. The phase timers are only installed when
+# instrumentation is enabled at import time, otherwise `Instrumentation.timed` hands back the function untouched
+INSTRUMENTATION_ENV = 'CHECKERS_INSTRUMENTATION'
+
+
+class SearchStats:
+    """
+    What one search did: wall time per phase, node counts and the transposition table traffic
+
+    Arguments:
+        self (SearchStats): The internal state
+        label (str): The kind of search (e.g. 'search_best_move', 'iterative_deepening')
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: SearchStats, label: str = '') -> None:
+        self.label = label
+        # phase -> seconds spent in its outermost calls, and how many calls there were
+        self.phase_seconds: dict[str, float] = {}
+        self.phase_calls: dict[str, int] = {}
+        self.seconds = 0.0
+        self.depth = 0
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        # nodes of each completed iterative deepening iteration
+        self.iteration_nodes: list[int] = []
+
+    @property
+    def effective_branching_factor(self: SearchStats) -> float:
+        # the growth between the last two iterations, or the depth-th root of the nodes for a single search
+        if len(self.iteration_nodes) >= 2 and self.iteration_nodes[-2] > 0:
+            return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+        if self.depth > 0 and self.nodes > 0:
+            return self.nodes ** (1 / self.depth)
+        return 0.0
+
+    @property
+    def nodes_per_second(self: SearchStats) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self: SearchStats) -> dict:
+        return {'label': self.label, 'seconds': self.seconds, 'depth': self.depth, 'nodes': self.nodes,
+                'leaves': self.leaves, 'cutoffs': self.cutoffs, 'tt_probes': self.tt_probes, 'tt_hits': self.tt_hits,
+                'effective_branching_factor': self.effective_branching_factor,
+                'nodes_per_second': self.nodes_per_second, 'iteration_nodes': self.iteration_nodes,
+                'phase_seconds': self.phase_seconds, 'phase_calls': self.phase_calls}
+
+
+class Instrumentation:
+    """
+    Collects SearchStats for every search while enabled, and does nothing but check `enabled` otherwise. Finished
+    stats go to `last`, to the JSON-lines sink when one is open and to every callback
+
+    Arguments:
+        self (Instrumentation): The internal state
+        enabled (bool): Whether searches are recorded
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: Instrumentation, enabled: bool = False) -> None:
+        self.enabled = enabled
+        # the phases timed since the last search finished
+        self.stats = SearchStats()
+        self.last: Optional[SearchStats] = None
+        self.sink: Optional[TextIO] = None
+        self.callbacks: list[Callable[[SearchStats], None]] = []
+        # phases currently running, so recursive calls are only timed once
+        self.active_phases: set[str] = set()
+
+    def timed(self: Instrumentation, phase: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator adding the wall time of the function to `phase`. Recursive calls count towards the calls but only
+        the outermost one is timed, so the phase time is never counted twice
+
+        Arguments:
+            self (Instrumentation): The internal state
+            phase (str): The phase name
+
+        Returns:
+            The decorator, which returns the function itself when instrumentation is disabled
+        """
+        def decorator(func: Callable) -> Callable:
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                stats = self.stats
+                stats.phase_calls[phase] = stats.phase_calls.get(phase, 0) + 1
+                if phase in self.active_phases:
+                    return func(*args, **kwargs)
+                self.active_phases.add(phase)
+                started = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.active_phases.discard(phase)
+                    stats.phase_seconds[phase] = stats.phase_seconds.get(
+                        phase, 0.0) + perf_counter() - started
+
+            return wrapper
+
+        return decorator
+
+    def start_search(self: Instrumentation, table=None) -> Optional[tuple[float, int, int]]:
+        # (start time, table probes, table hits) to hand to finish_search, None when disabled
+        if not self.enabled:
+            return None
+        self.stats = SearchStats()
+        return (perf_counter(), table.probes if table is not None else 0, table.hits if table is not None else 0)
+
+    def finish_search(self: Instrumentation, started: Optional[tuple[float, int, int]], label: str, depth: int, nodes: int, leaves: int = 0, cutoffs: int = 0, table=None, iteration_nodes: Optional[list[int]] = None) -> Optional[SearchStats]:
+        """
+        Completes the stats of a search begun with start_search and publishes them
+
+        Arguments:
+            self (Instrumentation): The internal state
+            started (Optional[tuple[float, int, int]]): What start_search returned, nothing is recorded for None
+            label (str): The kind of search
+            depth (int): The depth reached
+            nodes (int): The positions visited
+            leaves (int): The positions scored at the horizon
+            cutoffs (int): The beta cutoffs
+            table (Optional[TranspositionTable]): The table searched, for its probe and hit counts
+            iteration_nodes (Optional[list[int]]): The nodes of each iterative deepening iteration
+
+        Returns:
+            The stats, None when nothing was recorded
+        """
+        if started is None:
+            return None
+        started_at, probes, hits = started
+        stats = self.stats
+        stats.label = label
+        stats.seconds = perf_counter() - started_at
+        stats.depth = depth
+        stats.nodes = nodes
+        stats.leaves = leaves
+        stats.cutoffs = cutoffs
+        if table is not None:
+            stats.tt_probes = table.probes - probes
+            stats.tt_hits = table.hits - hits
+        stats.iteration_nodes = list(iteration_nodes or [])
+
+        self.last = stats
+        self.stats = SearchStats()
+        if self.sink is not None:
+            self.sink.write(json.dumps({'time': time(), **stats.to_dict()}) + '\n')
+            self.sink.flush()
+        for each_callback in self.callbacks:
+            each_callback(stats)
+        return stats
+
+    def add_callback(self: Instrumentation, callback: Callable[[SearchStats], None]) -> None:
+        # called with the stats of every finished search, e.g. to forward them to an external profiler
+        self.callbacks.append(callback)
+
+    def remove_callback(self: Instrumentation, callback: Callable[[SearchStats], None]) -> None:
+        self.callbacks.remove(callback)
+
+    def open_sink(self: Instrumentation, path: str) -> None:
+        # appends one JSON object per finished search to `path`
+        self.close_sink()
+        self.sink = open(path, 'a', encoding='utf-8')
+
+    def close_sink(self: Instrumentation) -> None:
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+
+INSTRUMENTATION = Instrumentation(os.environ.get(
+    INSTRUMENTATION_ENV, '0') not in ('', '0'))
@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import Optional
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, cpu_count
+
+from translatemain import (MAX_PLY, MAX_SEARCH_DEPTH, WIN_SCORE, CheckersMove, CheckersState, SearchContext,
+                           SearchResult, SearchTimeout, TTBound, negamax)
+
+# Slot layout, two unsigned 64-bit words: (key ^ data, data). A reader only trusts a slot when the two words agree
+# with the key it is probing, so a write torn by another process reads as a miss instead of a wrong entry.
+#   data bits 0-6    depth
+#   data bits 7-8    bound
+#   data bits 9-31   score + SCORE_OFFSET
+#   data bits 32-63  move key (CheckersMove.key)
+SLOT_WORDS = 2
+WORD_BYTES = 8
+DEPTH_MASK = 0x7F
+BOUND_SHIFT = 7
+SCORE_SHIFT = 9
+SCORE_BITS = 23
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+MOVE_SHIFT = 32
+TT_BOUNDS = [TTBound.EXACT, TTBound.LOWER, TTBound.UPPER]
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table living in a `multiprocessing.shared_memory` block, so every worker process reads and writes
+    the same entries without locks. Same interface as TranspositionTable (depth-preferred replacement, no aging)
+
+    Arguments:
+        self (SharedTranspositionTable): The internal state
+        size (int): The number of slots, rounded down to a power of two (16 bytes each)
+        name (Optional[str]): The name of an existing block to attach to, a new block is created when omitted
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: SharedTranspositionTable, size: int = 1 << 20, name: Optional[str] = None) -> None:
+        self.size = 1 << (max(size, 1).bit_length() - 1)
+        self.mask = self.size - 1
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=self.size * SLOT_WORDS * WORD_BYTES)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.words = self.memory.buf.cast('Q')
+        if self.owner:
+            self.clear()
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self: SharedTranspositionTable, key: int) -> Optional[tuple[int, TTBound, float, int]]:
+        # (depth, bound, score, move key) stored for the position, None on a miss
+        self.probes += 1
+        slot = (key & self.mask) * SLOT_WORDS
+        data = self.words[slot + 1]
+        if self.words[slot] ^ data != key or data == 0:
+            return None
+        self.hits += 1
+        return (data & DEPTH_MASK, TT_BOUNDS[data >> BOUND_SHIFT & 0x3],
+                (data >> SCORE_SHIFT & ((1 << SCORE_BITS) - 1)) - SCORE_OFFSET, data >> MOVE_SHIFT)
+
+    def store(self: SharedTranspositionTable, key: int, depth: int, bound: TTBound, score: float, move_key: int = 0) -> None:
+        slot = (key & self.mask) * SLOT_WORDS
+        stored_data = self.words[slot + 1]
+        stored_key = self.words[slot] ^ stored_data
+        if stored_data != 0 and stored_key != key and (stored_data & DEPTH_MASK) > depth:
+            return
+        if stored_key == key and move_key == 0:
+            # keep the best move found by an earlier search of this position
+            move_key = stored_data >> MOVE_SHIFT
+        data = min(depth, DEPTH_MASK) | TT_BOUNDS.index(bound) << BOUND_SHIFT \
+            | (int(score) + SCORE_OFFSET) << SCORE_SHIFT | move_key << MOVE_SHIFT
+        self.words[slot] = key ^ data
+        self.words[slot + 1] = data
+
+    def new_search(self: SharedTranspositionTable) -> None:
+        # entries are not aged, depth alone decides replacement
+        pass
+
+    def clear(self: SharedTranspositionTable) -> None:
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+
+    def close(self: SharedTranspositionTable) -> None:
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _lazy_smp_worker(table_name: str, table_size: int, encoded_root: bytes, rows: int, cols: int, worker_index: int, time_budget_ms: float, max_depth: int) -> tuple[int, float, list[tuple], int]:
+    """
+    One Lazy-SMP worker: iterative deepening over the shared table until the time budget runs out
+
+    Returns:
+        (deepest completed depth, its score, its principal variation as move tuples, nodes visited)
+    """
+    table = SharedTranspositionTable(table_size, table_name)
+    root = CheckersState.from_bytes(encoded_root, rows, cols)
+    context = SearchContext(table)
+    deadline = perf_counter() + time_budget_ms / 1000
+
+    completed: tuple[int, float, list[CheckersMove]] = (0, 0, [])
+    # odd workers start a ply deeper, so the workers spread over neighbouring depths and fill the table for each other
+    for depth in range(1 + worker_index % 2, max_depth + 1):
+        # the main worker always finishes its first iteration, so there is a move to return
+        context.deadline = deadline if worker_index > 0 or completed[0] > 0 else None
+        try:
+            score, line = negamax(root, depth, float(
+                '-inf'), float('inf'), context)
+        except SearchTimeout:
+            break
+        completed = (depth, score, line)
+        context.pv_keys = [x.key() for x in line]
+        if not line or abs(score) >= WIN_SCORE - MAX_PLY or perf_counter() >= deadline:
+            break
+
+    table.close()
+    depth, score, line = completed
+    return (depth, score, [x.to_tuple() for x in line], context.nodes)
+
+
+def lazy_smp_search(state: CheckersState, workers: Optional[int] = None, time_budget_ms: float = 1000, max_depth: int = MAX_SEARCH_DEPTH, table_size: int = 1 << 20) -> tuple[SearchResult, list[int]]:
+    """
+    Lazy-SMP search: every worker process searches the whole position at staggered depths, sharing one lock-free
+    transposition table, and the deepest completed iteration (the lowest worker on ties) gives the move
+
+    Arguments:
+        state (CheckersState): The root position (left untouched)
+        workers (Optional[int]): The amount of worker processes (one per CPU when omitted)
+        time_budget_ms (float): The wall-clock budget of each worker in milliseconds
+        max_depth (int): The deepest iteration to run
+        table_size (int): The number of shared table slots
+
+    Returns:
+        The search result and the amount of nodes each worker visited
+    """
+    worker_count = max(1, workers or cpu_count())
+    table = SharedTranspositionTable(table_size)
+    try:
+        with ProcessPoolExecutor(max_workers=worker_count) as pool:
+            futures = [pool.submit(_lazy_smp_worker, table.name, table.size, state.to_bytes(), state.rows, state.cols, x,
+                                   time_budget_ms, max_depth)
+                       for x in range(worker_count)]
+            outcomes = [x.result() for x in futures]
+    finally:
+        table.close()
+
+    best = max(range(worker_count), key=lambda x: (outcomes[x][0], -x))
+    depth, score, line, _ = outcomes[best]
+    principal_variation = [CheckersMove(None, *x) for x in line]
+    worker_nodes = [x[3] for x in outcomes]
+    result = SearchResult(score, principal_variation[0] if principal_variation else None, principal_variation,
+                          sum(worker_nodes), depth)
+    return result, worker_nodes
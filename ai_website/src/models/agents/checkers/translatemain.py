@@ -1,12 +1,17 @@
 from __future__ import annotations
+import os
 import string
-from time import sleep
-from typing import Optional
+from time import sleep, perf_counter
+from math import exp
+from typing import Callable, Iterator, Optional
 from enum import Enum
-from random import randint
+from random import randint, Random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Value, cpu_count
 
 from designer import play_music
-from graph import GraphNode, GraphNodeType
+from translatehelpers import INSTRUMENTATION
+from graph import GraphArena, GraphNode, GraphNodeType
 
 
 # [X] - Make sure the board is generating properly
@@ -16,7 +21,7 @@ from graph import GraphNode, GraphNodeType
 # [ ] - Run algorithm on simple move generation, ensuring that the maximum result is being picked
 # [ ] - Add minimax structure, such that the moves are iterated until the depth is reached, then the minimax tree is given all the paths to terminal nodes (ending depths)
 # [ ] - Test minimax structure, ensure is working correctly
-# [ ] - Add estimax structure, such that instead of the minimizer, we have a value estimator where each minimizer would be
+# [X] - Add estimax structure, such that instead of the minimizer, we have a value estimator where each minimizer would be
 
 # pylint: disable=pointless-string-statement
 """
@@ -40,15 +45,10 @@ This can then tie into alpha-beta pruning, which will allow us to cut off moves
 
 
 def move_directions_map(move_direction: CheckersMoves, row: int, col: int, calc_jump: bool = False) -> tuple[int, int]:
-    if move_direction == CheckersMoves.DIAG_BOTTOM_LEFT:
-        return (row + (2 if calc_jump else 1), col - (2 if calc_jump else 1))
-    elif move_direction == CheckersMoves.DIAG_BOTTOM_RIGHT:
-        return (row + (2 if calc_jump else 1), col + (2 if calc_jump else 1))
-    elif move_direction == CheckersMoves.DIAG_TOP_LEFT:
-        return (row - (2 if calc_jump else 1), col - (2 if calc_jump else 1))
-    else:
-        # DIAG_TOP_RIGHT
-        return (row - (2 if calc_jump else 1), col + (2 if calc_jump else 1))
+    # may be off the board, BoardGeometry's tables hold the bounds-checked squares
+    step_row, step_col = MOVE_DIRECTION_OFFSETS[move_direction]
+    distance = 2 if calc_jump else 1
+    return (row + distance * step_row, col + distance * step_col)
 
 
 def generate_checkers_board(rows: int, cols: int) -> list[list[BoardPiece]]:
@@ -70,158 +70,82 @@ def init_board(state: CheckersState) -> CheckersState:
 
     for i in range(0, both_side_size):
         for j in range(0 if odds else 1, state.cols, 2):
-            state.board[i][j].place_piece(CheckersPiece(
-                players[player], state.board[i][j].x, state.board[i][j].y, state.rows, state.cols))
+            state.place_piece(j, i, players[player])
         odds = not odds
 
     player += 1
     odds = True
     for i in range(0, both_side_size):
         for j in range(0 if odds else 1, state.cols, 2):
-            state.board[-1 * (i + 1)
-                        ][j].place_piece(CheckersPiece(players[player], state.board[-1 * (i + 1)][j].x, state.board[-1 * (i + 1)][j].y, state.rows, state.cols))
+            state.place_piece(j, state.rows - (i + 1), players[player])
         odds = not odds
 
     return state
 
 
-def calculate_vulnerable_points(piece: CheckersPiece, board: CheckersState) -> int:
-    coord_x = piece.x
-    coord_y = piece.y
+def get_board_geometry(rows: int, cols: int) -> BoardGeometry:
+    geometry = BOARD_GEOMETRIES.get((rows, cols))
+    if geometry is None:
+        geometry = BoardGeometry(rows, cols)
+        BOARD_GEOMETRIES[(rows, cols)] = geometry
+    return geometry
 
-    coord_x_lower_left, coord_y_lower_left, coord_y_upper_left, coord_x_upper_left, coord_x_upper_right, coord_y_upper_right, coord_y_lower_right, coord_x_lower_right = 0, 0, 0, 0, 0, 0, 0, 0
 
-    threats = 0
+def iterate_bits(bitboard: int):
+    # yields the index of every set bit, lowest first
+    while bitboard:
+        low_bit = bitboard & -bitboard
+        yield low_bit.bit_length() - 1
+        bitboard ^= low_bit
 
-    # upper left --> lower right
-    try:
-        coord_x_upper_left = coord_x - 1
-        coord_y_upper_left = coord_y + 1
-        coord_x_lower_right = coord_x + 1
-        coord_y_lower_right = coord_y - 1
-        is_threat = board.board[coord_y_upper_left][coord_x_upper_left].piece.owner != piece.owner and board.board[coord_y_lower_right][coord_x_lower_right].piece is None
-        threats += 1 if is_threat else 0
-    except:
-        pass
-
-    # upper right --> lower left
-    try:
-        coord_x_upper_right = coord_x + 1
-        coord_y_upper_right = coord_y + 1
-        coord_x_lower_left = coord_x - 1
-        coord_y_lower_left = coord_y - 1
-        is_threat = board.board[coord_y_upper_right][coord_x_upper_right].piece.owner != piece.owner and board.board[coord_y_lower_left][coord_x_lower_left] is None
-        threats += 1 if is_threat else 0
-    except:
-        pass
-
-    # IF KING lower left --> upper right
-    try:
-        is_threat = board.board[coord_y_lower_left][coord_x_lower_left].piece.owner != piece.owner and board.board[
-            coord_y_lower_left][coord_x_lower_left].piece.is_king and board.board[coord_y_upper_right][coord_x_upper_right] is None
-        threats += 1 if is_threat else 0
-    except:
-        pass
 
-    # IF KING lower right --> upper left
-    try:
-        is_threat = board.board[coord_y_lower_right][coord_x_lower_right].piece.owner != piece.owner and board.board[
-            coord_y_lower_right][coord_x_lower_right].piece.is_king and board.board[coord_y_upper_left][coord_x_upper_left] is None
-        threats += 1 if is_threat else 0
-    except:
-        pass
-
-    return threats
+def calculate_vulnerable_points(piece: CheckersPiece, board: CheckersState) -> int:
+    # enemy pieces that could jump this piece right now
+    return board.square_threats(board.geometry.index_of(piece.x, piece.y), piece.owner)[0]
 
 
 def calculate_safe_positions(piece: CheckersPiece, board: CheckersState) -> int:
     # safe being not in the diagonal path, or having a piece in the diagonal where it would land if it jumps
+    return board.square_threats(board.geometry.index_of(piece.x, piece.y), piece.owner)[1]
 
-    safe_points = 0
-    coord_x = piece.x
-    coord_y = piece.y
-
-    coord_x_upper_left = coord_x - 1
-    coord_y_upper_left = coord_y + 1
-    coord_x_lower_right = coord_x + 1
-    coord_y_lower_right = coord_y - 1
-    coord_x_upper_right = coord_x + 1
-    coord_y_upper_right = coord_y + 1
-    coord_x_lower_left = coord_x - 1
-    coord_y_lower_left = coord_y - 1
-    coord_x_left = coord_x - 1
-    coord_x_right = coord_x + 1
-    coord_y_above = coord_y - 1
-    coord_y_below = coord_y + 1
-
-    # upper left --> lower right
-    try:
-        is_safe = board.board[coord_y_upper_left][coord_x_upper_left].piece.owner != piece.owner and board.board[
-            coord_y_lower_right][coord_x_lower_right].piece is not None
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
-
-    # upper right --> lower left
-    try:
-        is_safe = board.board[coord_y_upper_right][coord_x_upper_right].piece.owner != piece.owner and board.board[coord_y_lower_left][coord_x_lower_left] is not None
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
 
-    # IF KING lower left --> upper right
-    try:
-        is_safe = board.board[coord_y_lower_left][coord_x_lower_left].piece.owner != piece.owner and board.board[
-            coord_y_lower_left][coord_x_lower_left].piece.is_king and board.board[coord_y_upper_right][coord_x_upper_right] is not None
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
-
-    # IF KING lower right --> upper left
-    try:
-        is_safe = board.board[coord_y_lower_right][coord_x_lower_right].piece.owner != piece.owner and board.board[
-            coord_y_lower_right][coord_x_lower_right].piece.is_king and board.board[coord_y_upper_left][coord_x_upper_left] is not None
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
-
-    # above
-    try:
-        is_safe = board.board[coord_y_above][coord_x].piece.owner != piece.owner
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
+def is_forced_jump(piece: CheckersPiece, board: CheckersState) -> bool:
+    return calculate_vulnerable_points(piece, board) > 0
 
-    # below
-    try:
-        is_safe = board.board[coord_y_below][coord_x].piece.owner != piece.owner
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
 
-    # right
-    try:
-        is_safe = board.board[coord_y][coord_x_right].piece.owner != piece.owner
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
+@INSTRUMENTATION.timed('sort_states_by_heuristic')
+def sort_states_by_heuristic(states: list[CheckersState], evaluator: Optional[Callable[[list[CheckersState]], list[int]]] = None) -> list[CheckersState]:
+    # evaluator scores all the states in one call (e.g. translatebatcheval.evaluate_states)
+    if evaluator is None:
+        return sorted(states, key=lambda x: x.generate_heuristic())
+    scores = evaluator(states)
+    return [states[x] for x in sorted(range(len(states)), key=lambda x: scores[x])]
 
-    # left
-    try:
-        is_safe = board.board[coord_y][coord_x_left].piece.owner != piece.owner
-        safe_points += 1 if is_safe else 0
-    except:
-        pass
 
-    return safe_points
+def encode_states(states: list[CheckersState]) -> bytes:
+    """
+    Batch form of CheckersState.to_bytes, the encodings back to back in one buffer. Every record has the same size
+    (BoardGeometry.encoded_size), so `numpy.frombuffer(buffer, dtype=numpy.uint8).reshape(-1, encoded_size)` or a
+    memoryview reads it in place (see translatebatcheval.planes_from_buffer)
 
+    Arguments:
+        states (list[CheckersState]): Positions of the same board size
 
-def is_forced_jump(piece: CheckersPiece, board: CheckersState) -> bool:
-    return calculate_vulnerable_points(piece, board) > 0
+    Returns:
+        The buffer
+    """
+    return b''.join(x.to_bytes() for x in states)
 
 
-def sort_states_by_heuristic(states: list[CheckersState]) -> list[CheckersState]:
-    return sorted(states, key=lambda x: x.generate_heuristic())
+def decode_states(buffer: bytes | memoryview, rows: int = 8, cols: int = 8) -> Iterator[CheckersState]:
+    # the positions of an encode_states buffer, built one at a time as they are iterated
+    view = memoryview(buffer)
+    encoded_size = get_board_geometry(rows, cols).encoded_size
+    if len(view) % encoded_size:
+        raise ValueError(
+            f'A buffer of {rows}x{cols} positions is a multiple of {encoded_size} bytes, got {len(view)}')
+    for offset in range(0, len(view), encoded_size):
+        yield CheckersState.from_bytes(view[offset:offset + encoded_size], rows, cols)
 
 
 """
@@ -262,6 +186,41 @@ class CheckersMoves(Enum):
     CAPTURE_BOTTOM_RIGHT = 7
 
 
+# (row, col) step of each move type, captures travel the same diagonal twice as far
+MOVE_DIRECTION_OFFSETS: dict[CheckersMoves, tuple[int, int]] = {
+    CheckersMoves.DIAG_TOP_LEFT: (-1, -1),
+    CheckersMoves.DIAG_TOP_RIGHT: (-1, 1),
+    CheckersMoves.DIAG_BOTTOM_LEFT: (1, -1),
+    CheckersMoves.DIAG_BOTTOM_RIGHT: (1, 1),
+    CheckersMoves.CAPTURE_TOP_LEFT: (-1, -1),
+    CheckersMoves.CAPTURE_TOP_RIGHT: (-1, 1),
+    CheckersMoves.CAPTURE_BOTTOM_LEFT: (1, -1),
+    CheckersMoves.CAPTURE_BOTTOM_RIGHT: (1, 1),
+}
+
+DIAGONAL_DIRECTIONS: list[CheckersMoves] = [CheckersMoves.DIAG_TOP_LEFT, CheckersMoves.DIAG_TOP_RIGHT,
+                                            CheckersMoves.DIAG_BOTTOM_LEFT, CheckersMoves.DIAG_BOTTOM_RIGHT]
+
+OPPOSITE_DIRECTIONS: dict[CheckersMoves, CheckersMoves] = {
+    CheckersMoves.DIAG_TOP_LEFT: CheckersMoves.DIAG_BOTTOM_RIGHT,
+    CheckersMoves.DIAG_TOP_RIGHT: CheckersMoves.DIAG_BOTTOM_LEFT,
+    CheckersMoves.DIAG_BOTTOM_LEFT: CheckersMoves.DIAG_TOP_RIGHT,
+    CheckersMoves.DIAG_BOTTOM_RIGHT: CheckersMoves.DIAG_TOP_LEFT,
+}
+
+# the directions men of each player may move in, right before left
+FORWARD_DIRECTIONS: dict[CheckersPlayer, list[CheckersMoves]] = {
+    CheckersPlayer.BOTTOM: [CheckersMoves.DIAG_TOP_RIGHT, CheckersMoves.DIAG_TOP_LEFT],
+    CheckersPlayer.TOP: [CheckersMoves.DIAG_BOTTOM_RIGHT, CheckersMoves.DIAG_BOTTOM_LEFT],
+}
+
+# CheckersState.to_bytes square codes, code n holds SQUARE_CODE_PIECES[n - 1] as (owner, is_king) and 0 is empty
+SQUARE_CODE_BITS = 3
+SQUARE_CODE_MASK = (1 << SQUARE_CODE_BITS) - 1
+SQUARE_CODE_PIECES: list[tuple[CheckersPlayer, bool]] = [(CheckersPlayer.BOTTOM, False), (CheckersPlayer.BOTTOM, True),
+                                                         (CheckersPlayer.TOP, False), (CheckersPlayer.TOP, True)]
+
+
 class CheckersTurn(Enum):
     """
     Represents who's turn it is
@@ -270,6 +229,42 @@ class CheckersTurn(Enum):
     CPU = 1
 
 
+class TTBound(Enum):
+    """
+    Represents how a stored transposition table score relates to the real score of the position
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TTReplacement(Enum):
+    """
+    Represents which entry wins when two positions map to the same transposition table slot
+    """
+    ALWAYS = 0
+    DEPTH_PREFERRED = 1
+
+
+class MoveOrderingMode(Enum):
+    """
+    Represents which hints MoveOrdering sorts the moves of a search by, each mode adding to the one before it
+    """
+    NONE = 0
+    TABLE = 1
+    KILLERS = 2
+    HISTORY = 3
+
+
+class OpponentModel(Enum):
+    """
+    Represents how the expectimax search expects the opponent to pick its moves
+    """
+    UNIFORM = 0
+    SOFTMAX = 1
+    POLICY = 2
+
+
 """
 ░█▀▀░█▀█░█▀▄░░░█▀▀░█▀█░█░█░█▄█░█▀▀
 ░█▀▀░█░█░█░█░░░█▀▀░█░█░█░█░█░█░▀▀█
@@ -325,15 +320,20 @@ class CheckersMove:
 
     Arguments:
         self (CheckersMove): The internal state
-        board (list[list[BoardPiece]]): Represents a 2D array of board pieces
+        board (Optional[list[list[BoardPiece]]]): Represents a 2D array of board pieces (None when generated from bitboards)
         from_x (int): The x coordinate where the piece is originating from
         from_y (int): The y coordinate where the piece is originating from
         to_x (int): The x coordinate where the piece is traveling to
         to_y (int): The y coordinate where the piece is traveling to
         capture (bool): Whether the piece is captured (field will be removed in future versions)
+        capture_x (int): The x coordinate of the (first) captured piece
+        capture_y (int): The y coordinate of the (first) captured piece
+        path (Optional[list[tuple[int, int]]]): Every square the piece lands on, ending with (to_x, to_y), more than
+            one for a multi-jump
+        captured (Optional[list[tuple[int, int]]]): Every piece jumped, in order
     """
 
-    def __init__(self: CheckersMove, board: list[list[BoardPiece]], from_x: int, from_y: int, to_x: int, to_y: int, capture: bool = False, capture_x=0, capture_y=0):
+    def __init__(self: CheckersMove, board: Optional[list[list[BoardPiece]]], from_x: int, from_y: int, to_x: int, to_y: int, capture: bool = False, capture_x=0, capture_y=0, path: Optional[list[tuple[int, int]]] = None, captured: Optional[list[tuple[int, int]]] = None):
         self.board = board
         self.from_x = from_x
         self.from_y = from_y
@@ -342,12 +342,66 @@ class CheckersMove:
         self.capture = capture
         self.capture_x = capture_x
         self.capture_y = capture_y
+        self.path: list[tuple[int, int]] = path if path is not None else [
+            (to_x, to_y)]
+        self.captured: list[tuple[int, int]] = captured if captured is not None else [
+            (capture_x, capture_y)] if capture else []
+
+    def key(self: CheckersMove) -> int:
+        # packs the endpoints into a single int for the move ordering hints of the search tables. Two jump sequences
+        # between the same squares share a key, so it must not be used to pick the move to play, see route_key
+        return self.from_x | self.from_y << 8 | self.to_x << 16 | self.to_y << 24
+
+    def route_key(self: CheckersMove) -> int:
+        # key() with the diagonal of every landing above bit 32 (2 bits each, after a leading 1 so routes of different
+        # lengths differ), which tells apart every move of a position. 57 bits at most on 8x8, where 12 jumps is the
+        # longest capture
+        route = 1
+        (curr_x, curr_y) = (self.from_x, self.from_y)
+        for (each_x, each_y) in self.path:
+            route = route << 2 | (each_x > curr_x) | (each_y > curr_y) << 1
+            (curr_x, curr_y) = (each_x, each_y)
+        return self.key() | route << 32
+
+    def to_tuple(self: CheckersMove) -> tuple:
+        # picklable form for worker processes, CheckersMove(None, *move.to_tuple()) rebuilds the move
+        return (self.from_x, self.from_y, self.to_x, self.to_y, self.capture, self.capture_x, self.capture_y, self.path, self.captured)
 
     def __repr__(self: CheckersMove) -> str:
-        return f'From ({self.from_x}, {self.from_y}) TO ({self.to_x}, {self.to_y})'
+        return str(self)
 
     def __str__(self: CheckersMove) -> str:
-        return f'From ({self.from_x}, {self.from_y}) TO ({self.to_x}, {self.to_y})'
+        via = f' VIA {", ".join(f"({x}, {y})" for (x, y) in self.path[:-1])}' if len(
+            self.path) > 1 else ''
+        return f'From ({self.from_x}, {self.from_y}) TO ({self.to_x}, {self.to_y}){via}'
+
+
+class CheckersUndo:
+    """
+    Records what `CheckersState.make_move` changed, so `CheckersState.unmake_move` can restore the state in place
+
+    Arguments:
+        self (CheckersUndo): The internal state
+        move (CheckersMove): The move that was applied
+        previous_turn (CheckersPlayer): The turn before the move was applied
+        previous_depth (int): The depth before the move was applied
+    """
+
+    def __init__(self: CheckersUndo, move: CheckersMove, previous_turn: CheckersPlayer, previous_depth: int) -> None:
+        self.move = move
+        # (bitboard index, owner, is_king) of every captured piece
+        self.captured: list[tuple[int, CheckersPlayer, bool]] = []
+        # whether the moving man was crowned on landing
+        self.promoted = False
+        self.previous_turn = previous_turn
+        self.previous_depth = previous_depth
+        self.previous_moves: list[CheckersMove] = []
+        self.previous_applied_move: Optional[CheckersMove] = None
+        self.previous_applied_move_str: str = ''
+        # the per-side evaluation totals before the move, and (index, vulnerable, safe) of every square whose cached
+        # threats the move overwrote, in the order they were overwritten
+        self.previous_totals: tuple[int, ...] = ()
+        self.changed_squares: list[tuple[int, int, int]] = []
 
 
 class CheckersPiece:
@@ -379,7 +433,7 @@ class CheckersPiece:
 
     def compute_heuristic_value(self: CheckersPiece) -> int:
         # Material count
-        self.value += 2 if self.is_king else 1
+        self.value = 2 if self.is_king else 1
 
         # King's position
         opponents_kings_row_start = 0 if self.owner == CheckersPlayer.TOP else 5
@@ -429,6 +483,198 @@ class CheckersPiece:
         return f'({self.x}, {self.y}) - {"T" if self.owner == CheckersPlayer.TOP else "B"}'
 
 
+class BoardGeometry:
+    """
+    Maps the playable (dark) squares of a board onto bitboard indexes, shared by every state with the same dimensions
+
+    Arguments:
+        self (BoardGeometry): The internal state
+        rows (int): The total amount of rows in the board
+        cols (int): The total amount of columns in the board
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: BoardGeometry, rows: int, cols: int) -> None:
+        self.rows = rows
+        self.cols = cols
+        # dark squares are numbered row by row, starting from the top left
+        self.square_coords: list[tuple[int, int]] = []
+        self.square_index: list[int] = [-1] * (rows * cols)
+        for y in range(rows):
+            for x in range(cols):
+                if (x + y) % 2 == 1:
+                    self.square_index[y * cols + x] = len(self.square_coords)
+                    self.square_coords.append((x, y))
+        self.num_squares = len(self.square_coords)
+        self.full_mask = (1 << self.num_squares) - 1
+        # bytes of CheckersState.to_bytes, the side to move plus SQUARE_CODE_BITS per square
+        self.encoded_size = (1 + SQUARE_CODE_BITS * self.num_squares + 7) // 8
+
+        # Diagonal lookup tables, indexed [direction][square] where the direction is the value of a DIAG_* move type,
+        # -1 where the step leaves the board
+        self.neighbors: list[list[int]] = []
+        self.jump_landings: list[list[int]] = []
+        for each_direction in DIAGONAL_DIRECTIONS:
+            self.neighbors.append([self.index_of(*reversed(move_directions_map(each_direction, y, x)))
+                                   for (x, y) in self.square_coords])
+            self.jump_landings.append([self.index_of(*reversed(move_directions_map(each_direction, y, x, True)))
+                                       for (x, y) in self.square_coords])
+
+        # a square and its on-board diagonal neighbors
+        self.diagonal_squares: list[list[int]] = []
+        for index in range(self.num_squares):
+            self.diagonal_squares.append(
+                [index] + [x[index] for x in self.neighbors if x[index] >= 0])
+
+        # Moves a piece can make, indexed [side][is_king][square], as (landing, jumped) pairs with jumped -1 for a
+        # plain step. Men of BOTTOM move up the board (towards row 0), men of TOP down it, kings both ways
+        self.move_steps: list[list[list[list[tuple[int, int]]]]] = []
+        # Squares an enemy could jump a piece from, indexed [side][square] (side being the threatened piece's owner),
+        # as (attacker, landing, enemy men can jump too) triples
+        self.threats: list[list[list[tuple[int, int, bool]]]] = []
+        self.plain_steps: list[list[list[list[int]]]] = []
+        self.jump_steps: list[list[list[list[tuple[int, int]]]]] = []
+        for each_owner in (CheckersPlayer.BOTTOM, CheckersPlayer.TOP):
+            forward = FORWARD_DIRECTIONS[each_owner]
+            # kings move backwards the way the enemy's men move forwards
+            enemy_forward = FORWARD_DIRECTIONS[CheckersPlayer.TOP if each_owner ==
+                                               CheckersPlayer.BOTTOM else CheckersPlayer.BOTTOM]
+            owner_steps: list[list[list[tuple[int, int]]]] = []
+            for vertical_sets in ([forward], [forward, enemy_forward]):
+                square_steps: list[list[tuple[int, int]]] = []
+                for index in range(self.num_squares):
+                    steps: list[tuple[int, int]] = []
+                    for each_set in vertical_sets:
+                        steps.extend((self.neighbors[x.value][index], -1) for x in each_set
+                                     if self.neighbors[x.value][index] >= 0)
+                        steps.extend((self.jump_landings[x.value][index], self.neighbors[x.value][index]) for x in each_set
+                                     if self.jump_landings[x.value][index] >= 0)
+                    square_steps.append(steps)
+                owner_steps.append(square_steps)
+            self.move_steps.append(owner_steps)
+            # the same moves split into plain steps and jumps, indexed [side][is_king][square]
+            self.plain_steps.append([[[x for (x, jumped) in each_square if jumped < 0] for each_square in each_kind]
+                                     for each_kind in owner_steps])
+            self.jump_steps.append([[[(x, jumped) for (x, jumped) in each_square if jumped >= 0] for each_square in each_kind]
+                                    for each_kind in owner_steps])
+
+            owner_threats: list[list[tuple[int, int, bool]]] = []
+            for index in range(self.num_squares):
+                square_threats: list[tuple[int, int, bool]] = []
+                for each_direction in DIAGONAL_DIRECTIONS:
+                    # the attacker sits one way and jumps the other
+                    jump_direction = OPPOSITE_DIRECTIONS[each_direction]
+                    attacker = self.neighbors[each_direction.value][index]
+                    landing = self.neighbors[jump_direction.value][index]
+                    if attacker >= 0 and landing >= 0:
+                        square_threats.append(
+                            (attacker, landing, jump_direction in enemy_forward))
+                owner_threats.append(square_threats)
+            self.threats.append(owner_threats)
+
+        # the row men are crowned on, as a mask per side [BOTTOM (row 0), TOP (last row)]
+        self.promotion_masks: list[int] = [
+            sum(1 << ind for ind, (_, y) in enumerate(self.square_coords) if y == each_row) for each_row in (0, rows - 1)]
+
+        # Zobrist keys, one per (piece kind, square) plus one for TOP to move. Seeded by the board size so every
+        # process derives the same keys
+        zobrist_rng = Random(rows * 256 + cols)
+        self.zobrist_pieces: list[list[int]] = [[zobrist_rng.getrandbits(64) for _ in range(
+            self.num_squares)] for _ in range(4)]
+        self.zobrist_turn: int = zobrist_rng.getrandbits(64)
+
+        # CheckersPiece.compute_heuristic_value of a piece on each square, indexed [side][is_king][square]
+        self.piece_values: list[list[list[int]]] = []
+        for each_owner in (CheckersPlayer.BOTTOM, CheckersPlayer.TOP):
+            owner_values: list[list[int]] = []
+            for is_king in (False, True):
+                square_values: list[int] = []
+                for (x, y) in self.square_coords:
+                    piece = CheckersPiece(each_owner, x, y, rows, cols)
+                    piece.is_king = is_king
+                    square_values.append(piece.compute_heuristic_value())
+                owner_values.append(square_values)
+            self.piece_values.append(owner_values)
+
+    def index_of(self: BoardGeometry, x: int, y: int) -> int:
+        # -1 when the coordinate is off the board or a light square
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return self.square_index[y * self.cols + x]
+        return -1
+
+
+BOARD_GEOMETRIES: dict[tuple[int, int], BoardGeometry] = {}
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by Zobrist hash, memory stays bounded no matter how long the game runs
+
+    Entries live in parallel lists indexed by `hash & mask`, the full hash is kept to reject slot collisions.
+    DEPTH_PREFERRED keeps the deeper of two colliding entries, unless the stored one is from an older search
+    (see `new_search`)
+
+    Arguments:
+        self (TranspositionTable): The internal state
+        size (int): The number of slots, rounded down to a power of two
+        replacement (TTReplacement): The policy used when a slot is already taken
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: TranspositionTable, size: int = 1 << 18, replacement: TTReplacement = TTReplacement.DEPTH_PREFERRED) -> None:
+        self.size = 1 << (max(size, 1).bit_length() - 1)
+        self.mask = self.size - 1
+        self.replacement = replacement
+        self.generation = 0
+        self.keys: list[int] = [-1] * self.size
+        self.depths: list[int] = [0] * self.size
+        self.bounds: list[TTBound] = [TTBound.EXACT] * self.size
+        self.scores: list[float] = [0] * self.size
+        self.moves: list[int] = [0] * self.size
+        self.generations: list[int] = [0] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self: TranspositionTable, key: int) -> Optional[tuple[int, TTBound, float, int]]:
+        # (depth, bound, score, move key) stored for the position, None on a miss
+        self.probes += 1
+        slot = key & self.mask
+        if self.keys[slot] != key:
+            return None
+        self.hits += 1
+        return (self.depths[slot], self.bounds[slot], self.scores[slot], self.moves[slot])
+
+    def store(self: TranspositionTable, key: int, depth: int, bound: TTBound, score: float, move_key: int = 0) -> None:
+        slot = key & self.mask
+        if self.replacement == TTReplacement.DEPTH_PREFERRED and self.keys[slot] not in (-1, key) \
+                and self.generations[slot] == self.generation and self.depths[slot] > depth:
+            return
+        if self.keys[slot] == key and move_key == 0:
+            # keep the best move found by an earlier search of this position
+            move_key = self.moves[slot]
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.scores[slot] = score
+        self.moves[slot] = move_key
+        self.generations[slot] = self.generation
+
+    def new_search(self: TranspositionTable) -> None:
+        # entries from earlier searches become fair game for replacement
+        self.generation += 1
+
+    def clear(self: TranspositionTable) -> None:
+        self.keys = [-1] * self.size
+        self.generations = [0] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+
 """
 ░█▀▀░█▀█░█▀▄░░░█░█░▀█▀░▀█▀░█░░
 ░█▀▀░█░█░█░█░░░█░█░░█░░░█░░█░░
@@ -449,24 +695,42 @@ class CheckersState:
     """
     Represents a node in the state tree, a snapshot of the state of the game
 
+    The pieces are packed into four integer bitboards (bottom men, bottom kings, top men, top kings), one bit per
+    playable square as numbered by BoardGeometry. `board` is a read-only grid view rebuilt from them on demand, so
+    changes must go through `place_piece`/`remove_piece` rather than the view
+
     Arguments:
         self (CheckersState): The internal state
         rows (int): The # of rows in the board
         cols (int): The # of columns in the board
         curr_turn (Optional[CheckersPlayer]): The player who controls the current turn in the game
-        curr_board (Optional[list[BoardPiece]]): The current board in play
+        curr_board (Optional[list[BoardPiece]]): A board to load the pieces from
+        rng (Optional[Random]): Picks the turn when `curr_turn` is omitted, the module's random generator when
+            omitted (pass a seeded Random for reproducible runs)
 
     Returns:
         The checkers state instance
     """
 
-    def __init__(self: CheckersState, rows: int, cols: int, curr_turn: Optional[CheckersPlayer] = None, curr_board: Optional[list[list[BoardPiece]]] = None) -> None:
-        self.turn: CheckersPlayer = [CheckersPlayer.BOTTOM, CheckersPlayer.TOP][randint(
+    def __init__(self: CheckersState, rows: int, cols: int, curr_turn: Optional[CheckersPlayer] = None, curr_board: Optional[list[list[BoardPiece]]] = None, rng: Optional[Random] = None) -> None:
+        self.turn: CheckersPlayer = [CheckersPlayer.BOTTOM, CheckersPlayer.TOP][(rng.randint if rng is not None else randint)(
             0, 1)] if not curr_turn else curr_turn
-        self.board: list[list[BoardPiece]] = [[x.clone() for x in curr_board[y]] for y in range(rows)] if curr_board else generate_checkers_board(
-            rows, cols)
         self.rows = rows
         self.cols = cols
+        self.geometry: BoardGeometry = get_board_geometry(rows, cols)
+        self.bottom_men = 0
+        self.bottom_kings = 0
+        self.top_men = 0
+        self.top_kings = 0
+        self._board_view: Optional[list[list[BoardPiece]]] = None
+        self.hash: int = self.geometry.zobrist_turn if self.turn == CheckersPlayer.TOP else 0
+        # evaluation terms kept up to date square by square, per side [BOTTOM, TOP] and per square
+        self.piece_values: list[int] = [0, 0]
+        self.vulnerable_counts: list[int] = [0, 0]
+        self.safe_counts: list[int] = [0, 0]
+        self.forced_counts: list[int] = [0, 0]
+        self.square_vulnerable: list[int] = [0] * self.geometry.num_squares
+        self.square_safe: list[int] = [0] * self.geometry.num_squares
         self.value = 0
         self.moves: list[CheckersMove] = []
         self.explored: bool = False
@@ -475,203 +739,439 @@ class CheckersState:
         self.applied_move_str: str = ''
         self.applied_move: Optional[CheckersMove] = None
 
+        if curr_board:
+            for each_row in curr_board:
+                for each_tile in each_row:
+                    if each_tile.piece is not None:
+                        self.place_piece(
+                            each_tile.x, each_tile.y, each_tile.piece.owner, each_tile.piece.is_king)
+
+    @property
+    def board(self: CheckersState) -> list[list[BoardPiece]]:
+        if self._board_view is None:
+            self._board_view = self.clone_board()
+        return self._board_view
+
+    @property
+    def own_men(self: CheckersState) -> int:
+        return self.bottom_men if self.turn == CheckersPlayer.BOTTOM else self.top_men
+
+    @property
+    def own_kings(self: CheckersState) -> int:
+        return self.bottom_kings if self.turn == CheckersPlayer.BOTTOM else self.top_kings
+
+    @property
+    def enemy_men(self: CheckersState) -> int:
+        return self.top_men if self.turn == CheckersPlayer.BOTTOM else self.bottom_men
+
+    @property
+    def enemy_kings(self: CheckersState) -> int:
+        return self.top_kings if self.turn == CheckersPlayer.BOTTOM else self.bottom_kings
+
+    @property
+    def occupied(self: CheckersState) -> int:
+        return self.bottom_men | self.bottom_kings | self.top_men | self.top_kings
+
+    def player_pieces(self: CheckersState, player: CheckersPlayer) -> int:
+        if player == CheckersPlayer.BOTTOM:
+            return self.bottom_men | self.bottom_kings
+        return self.top_men | self.top_kings
+
     def next_turn(self: CheckersState) -> None:
         self.turn = CheckersPlayer.BOTTOM if self.turn == CheckersPlayer.TOP else CheckersPlayer.TOP
+        self.hash ^= self.geometry.zobrist_turn
+
+    def _toggle_bits(self: CheckersState, index: int, owner: CheckersPlayer, is_king: bool) -> None:
+        # adds the piece to an empty square, or removes it from the square it is on, keeping the hash in step
+        bit = 1 << index
+        if owner == CheckersPlayer.BOTTOM:
+            if is_king:
+                self.bottom_kings ^= bit
+                self.hash ^= self.geometry.zobrist_pieces[1][index]
+            else:
+                self.bottom_men ^= bit
+                self.hash ^= self.geometry.zobrist_pieces[0][index]
+        elif is_king:
+            self.top_kings ^= bit
+            self.hash ^= self.geometry.zobrist_pieces[3][index]
+        else:
+            self.top_men ^= bit
+            self.hash ^= self.geometry.zobrist_pieces[2][index]
+        self._board_view = None
+
+    def _toggle_square(self: CheckersState, index: int, owner: CheckersPlayer, is_king: bool, journal: Optional[list[tuple[int, int, int]]] = None) -> None:
+        # _toggle_bits, plus the evaluation terms of the square and of the pieces diagonally next to it (the only
+        # ones whose threats can change). The cached threats it overwrites are appended to `journal` when given
+        affected = self.geometry.diagonal_squares[index]
+        for each_index in affected:
+            self._update_threat_terms(each_index, -1)
+
+        side = 0 if owner == CheckersPlayer.BOTTOM else 1
+        piece_value = self.geometry.piece_values[side][is_king][index]
+        self._toggle_bits(index, owner, is_king)
+        if (self.bottom_men | self.bottom_kings | self.top_men | self.top_kings) >> index & 1:
+            self.piece_values[side] += piece_value
+        else:
+            self.piece_values[side] -= piece_value
+
+        for each_index in affected:
+            self._update_threat_terms(each_index, 1, journal)
+
+    def _update_threat_terms(self: CheckersState, index: int, sign: int, journal: Optional[list[tuple[int, int, int]]] = None) -> None:
+        # sign -1 takes the piece's cached threats out of the totals, sign 1 recomputes them and adds them back
+        bit = 1 << index
+        if (self.bottom_men | self.bottom_kings) & bit:
+            owner, side = CheckersPlayer.BOTTOM, 0
+        elif (self.top_men | self.top_kings) & bit:
+            owner, side = CheckersPlayer.TOP, 1
+        else:
+            return
+        if sign > 0:
+            if journal is not None:
+                journal.append((index, self.square_vulnerable[index], self.square_safe[index]))
+            self.square_vulnerable[index], self.square_safe[index] = self.square_threats(
+                index, owner)
+        vulnerable = self.square_vulnerable[index]
+        self.vulnerable_counts[side] += sign * vulnerable
+        self.safe_counts[side] += sign * self.square_safe[index]
+        if vulnerable > 0:
+            self.forced_counts[side] += sign
+
+    def square_threats(self: CheckersState, index: int, owner: CheckersPlayer) -> tuple[int, int]:
+        """
+        Counts the enemy pieces that could jump the `owner` piece on `index`: by direction, an enemy is a threat when
+        it sits diagonally next to the piece, can move towards it (kings always, men only forwards) and the square
+        behind the piece is on the board
+
+        Returns:
+            (vulnerable, safe), threats whose landing square is empty and threats whose landing square is taken
+        """
+        if owner == CheckersPlayer.BOTTOM:
+            enemy_men, enemy_kings, side = self.top_men, self.top_kings, 0
+        else:
+            enemy_men, enemy_kings, side = self.bottom_men, self.bottom_kings, 1
+        occupied = self.bottom_men | self.bottom_kings | self.top_men | self.top_kings
+
+        vulnerable = 0
+        safe = 0
+        for (attacker, landing, men_can_jump) in self.geometry.threats[side][index]:
+            if enemy_kings >> attacker & 1 or (men_can_jump and enemy_men >> attacker & 1):
+                if occupied >> landing & 1:
+                    safe += 1
+                else:
+                    vulnerable += 1
+        return (vulnerable, safe)
+
+    def compute_hash(self: CheckersState) -> int:
+        # full Zobrist hash from scratch, `hash` is kept equal to this incrementally
+        zobrist_pieces = self.geometry.zobrist_pieces
+        computed = self.geometry.zobrist_turn if self.turn == CheckersPlayer.TOP else 0
+        for kind, bitboard in enumerate((self.bottom_men, self.bottom_kings, self.top_men, self.top_kings)):
+            for each_index in iterate_bits(bitboard):
+                computed ^= zobrist_pieces[kind][each_index]
+        return computed
+
+    def _piece_on(self: CheckersState, index: int) -> Optional[tuple[CheckersPlayer, bool]]:
+        # (owner, is_king) of the piece on the square, None when empty
+        bit = 1 << index
+        if self.bottom_men & bit:
+            return (CheckersPlayer.BOTTOM, False)
+        if self.top_men & bit:
+            return (CheckersPlayer.TOP, False)
+        if self.bottom_kings & bit:
+            return (CheckersPlayer.BOTTOM, True)
+        if self.top_kings & bit:
+            return (CheckersPlayer.TOP, True)
+        return None
+
+    def place_piece(self: CheckersState, x: int, y: int, owner: CheckersPlayer, is_king: bool = False) -> None:
+        index = self.geometry.index_of(x, y)
+        if index < 0:
+            raise ValueError(f'({x}, {y}) is not a playable square')
+        existing = self._piece_on(index)
+        if existing is not None:
+            self._toggle_square(index, *existing)
+        self._toggle_square(index, owner, is_king)
+
+    def remove_piece(self: CheckersState, x: int, y: int) -> Optional[CheckersPiece]:
+        removed = self.piece_at(x, y)
+        if removed is not None:
+            self._toggle_square(self.geometry.index_of(
+                x, y), removed.owner, removed.is_king)
+        return removed
+
+    def piece_at(self: CheckersState, x: int, y: int) -> Optional[CheckersPiece]:
+        index = self.geometry.index_of(x, y)
+        found = self._piece_on(index) if index >= 0 else None
+        if found is None:
+            return None
+        piece = CheckersPiece(found[0], x, y, self.rows, self.cols)
+        piece.is_king = found[1]
+        return piece
+
+    def pieces_of(self: CheckersState, player: CheckersPlayer) -> list[CheckersPiece]:
+        pieces: list[CheckersPiece] = []
+        kings = self.bottom_kings if player == CheckersPlayer.BOTTOM else self.top_kings
+        for each_index in iterate_bits(self.player_pieces(player)):
+            x, y = self.geometry.square_coords[each_index]
+            piece = CheckersPiece(player, x, y, self.rows, self.cols)
+            piece.is_king = bool(kings >> each_index & 1)
+            pieces.append(piece)
+        return pieces
 
     def clone(self: CheckersState) -> CheckersState:
-        turn = self.turn
-        cloned_state = CheckersState(
-            self.rows, self.cols, self.turn, self.board)
+        cloned_state = CheckersState(self.rows, self.cols, self.turn)
+        cloned_state.bottom_men = self.bottom_men
+        cloned_state.bottom_kings = self.bottom_kings
+        cloned_state.top_men = self.top_men
+        cloned_state.top_kings = self.top_kings
+        cloned_state.hash = self.hash
+        cloned_state.piece_values = self.piece_values[:]
+        cloned_state.vulnerable_counts = self.vulnerable_counts[:]
+        cloned_state.safe_counts = self.safe_counts[:]
+        cloned_state.forced_counts = self.forced_counts[:]
+        cloned_state.square_vulnerable = self.square_vulnerable[:]
+        cloned_state.square_safe = self.square_safe[:]
         cloned_state.value = self.value
         cloned_state.explored = self.explored
         cloned_state.depth = self.depth
-        cloned_state.turn = turn
 
         return cloned_state
 
+    def pack(self: CheckersState) -> tuple[int, int, int, int, int, int, int]:
+        # compact picklable form for handing positions to worker processes, see unpack
+        return (self.rows, self.cols, 0 if self.turn == CheckersPlayer.BOTTOM else 1,
+                self.bottom_men, self.bottom_kings, self.top_men, self.top_kings)
+
+    def to_bytes(self: CheckersState) -> bytes:
+        # Canonical encoding, `geometry.encoded_size` bytes (13 on 8x8) read as one little endian int: bit 0 is the
+        # side to move (1 for TOP), then SQUARE_CODE_BITS per square in index order, 0 for empty and 1-4 for a
+        # BOTTOM man, BOTTOM king, TOP man or TOP king (see SQUARE_CODE_PIECES)
+        encoded = 0 if self.turn == CheckersPlayer.BOTTOM else 1
+        for (code, bitboard) in enumerate((self.bottom_men, self.bottom_kings, self.top_men, self.top_kings), 1):
+            for each_index in iterate_bits(bitboard):
+                encoded |= code << (1 + SQUARE_CODE_BITS * each_index)
+        return encoded.to_bytes(self.geometry.encoded_size, 'little')
+
+    @staticmethod
+    def from_bytes(data: bytes | memoryview, rows: int = 8, cols: int = 8) -> CheckersState:
+        # inverse of to_bytes, the board size is not part of the encoding
+        geometry = get_board_geometry(rows, cols)
+        if len(data) != geometry.encoded_size:
+            raise ValueError(
+                f'A {rows}x{cols} position is {geometry.encoded_size} bytes, got {len(data)}')
+        encoded = int.from_bytes(data, 'little')
+        state = CheckersState(
+            rows, cols, CheckersPlayer.TOP if encoded & 1 else CheckersPlayer.BOTTOM)
+        encoded >>= 1
+        for index in range(geometry.num_squares):
+            code = encoded & SQUARE_CODE_MASK
+            encoded >>= SQUARE_CODE_BITS
+            if code == 0:
+                continue
+            if code > len(SQUARE_CODE_PIECES):
+                raise ValueError(f'Invalid square code {code} at square {index}')
+            state._toggle_square(index, *SQUARE_CODE_PIECES[code - 1])
+        return state
+
+    @staticmethod
+    def unpack(packed: tuple[int, int, int, int, int, int, int]) -> CheckersState:
+        rows, cols, turn, bottom_men, bottom_kings, top_men, top_kings = packed
+        state = CheckersState(
+            rows, cols, CheckersPlayer.BOTTOM if turn == 0 else CheckersPlayer.TOP)
+        for (owner, is_king, bitboard) in ((CheckersPlayer.BOTTOM, False, bottom_men), (CheckersPlayer.BOTTOM, True, bottom_kings),
+                                           (CheckersPlayer.TOP, False, top_men), (CheckersPlayer.TOP, True, top_kings)):
+            for each_index in iterate_bits(bitboard):
+                state._toggle_square(each_index, owner, is_king)
+        return state
+
     def clone_board(self: CheckersState) -> list[list[BoardPiece]]:
-        cloned_board: list[list[BoardPiece]] = []
-        for each_row in self.board:
-            sub_row = []
-            for each_board_tile in each_row:
-                sub_row.append(each_board_tile.clone())
-            cloned_board.append(sub_row)
-            sub_row = []
+        cloned_board = generate_checkers_board(self.rows, self.cols)
+        for each_player in (CheckersPlayer.BOTTOM, CheckersPlayer.TOP):
+            for each_piece in self.pieces_of(each_player):
+                cloned_board[each_piece.y][each_piece.x].place_piece(
+                    each_piece)
         return cloned_board
 
+    def make_move(self: CheckersState, move: CheckersMove) -> CheckersUndo:
+        # applies the move in place, hand the result to unmake_move to take it back
+        geometry = self.geometry
+        undo = CheckersUndo(move, self.turn, self.depth)
+        undo.previous_moves = self.moves
+        undo.previous_applied_move = self.applied_move
+        undo.previous_applied_move_str = self.applied_move_str
+        undo.previous_totals = (*self.piece_values, *self.vulnerable_counts, *self.safe_counts, *self.forced_counts)
+        journal = undo.changed_squares
+
+        for (capture_x, capture_y) in move.captured:
+            # erase piece
+            captured_index = geometry.index_of(capture_x, capture_y)
+            captured_owner, captured_is_king = self._piece_on(captured_index)
+            undo.captured.append(
+                (captured_index, captured_owner, captured_is_king))
+            self._toggle_square(
+                captured_index, captured_owner, captured_is_king, journal)
+
+        from_index = geometry.index_of(move.from_x, move.from_y)
+        to_index = geometry.index_of(move.to_x, move.to_y)
+        owner, is_king = self._piece_on(from_index)
+        # a man reaching the far row is crowned
+        undo.promoted = not is_king and bool(geometry.promotion_masks[
+            0 if owner == CheckersPlayer.BOTTOM else 1] >> to_index & 1)
+        self._toggle_square(from_index, owner, is_king, journal)
+        self._toggle_square(to_index, owner, is_king or undo.promoted, journal)
+        self.applied_move_str = str(move)
+        self.applied_move = move
+        self.moves = []
+
+        self.next_turn()
+        self.depth += 1
+
+        return undo
+
+    def unmake_move(self: CheckersState, undo: CheckersUndo) -> None:
+        move = undo.move
+        geometry = self.geometry
+
+        to_index = geometry.index_of(move.to_x, move.to_y)
+        owner, is_king = self._piece_on(to_index)
+        self._toggle_bits(to_index, owner, is_king)
+        self._toggle_bits(geometry.index_of(
+            move.from_x, move.from_y), owner, is_king and not undo.promoted)
+
+        for (captured_index, captured_owner, captured_is_king) in undo.captured:
+            self._toggle_bits(captured_index, captured_owner, captured_is_king)
+
+        # only the squares the move touched, latest first so a square written twice ends on its oldest value
+        for (each_index, vulnerable, safe) in reversed(undo.changed_squares):
+            self.square_vulnerable[each_index] = vulnerable
+            self.square_safe[each_index] = safe
+        totals = undo.previous_totals
+        self.piece_values[0], self.piece_values[1] = totals[0], totals[1]
+        self.vulnerable_counts[0], self.vulnerable_counts[1] = totals[2], totals[3]
+        self.safe_counts[0], self.safe_counts[1] = totals[4], totals[5]
+        self.forced_counts[0], self.forced_counts[1] = totals[6], totals[7]
+
+        if self.turn != undo.previous_turn:
+            self.next_turn()
+        self.depth = undo.previous_depth
+        self.moves = undo.previous_moves
+        self.applied_move = undo.previous_applied_move
+        self.applied_move_str = undo.previous_applied_move_str
+
     def process_move(self: CheckersState, move: Optional[CheckersMove]) -> CheckersState:
         cloned_state = self.clone()
         cloned_state.explored = False
-
-        if move.capture:
-            # erase piece
-            cloned_state.board[move.capture_y][move.capture_x].piece = None
-
-        moving_piece = cloned_state.board[move.from_y][move.from_x].clone()
-        moving_piece.piece.x = move.to_x
-        moving_piece.piece.y = move.to_y
-
-        cloned_state.board[move.from_y][move.from_x].piece = None
-        cloned_state.board[move.to_y][move.to_x] = moving_piece
-        cloned_state.applied_move_str = str(move)
-        cloned_state.applied_move = move
-
-        cloned_state.next_turn()
-        cloned_state.depth += 1
+        cloned_state.make_move(move)
 
         return cloned_state
 
+    @INSTRUMENTATION.timed('process_moves')
     def process_moves(self: CheckersState) -> list[CheckersState]:
         processed_moves: list[CheckersState] = []
         for each_move in self.moves:
             processed_moves.append(self.process_move(each_move))
         return processed_moves
 
+    @INSTRUMENTATION.timed('generate_potential_moves')
     def generate_potential_moves(self: CheckersState) -> list[CheckersMove]:
-        # if is king, then can make all 4 jumps, if is not,
+        # if is king, then can move in all 4 diagonals, if is not,
         # check if top then only down left down right, if bottom then only up left up right
-        bottom_team_moves = [CheckersMoves.DIAG_TOP_RIGHT, CheckersMoves.DIAG_TOP_LEFT,
-                             CheckersMoves.CAPTURE_TOP_RIGHT, CheckersMoves.CAPTURE_TOP_LEFT]
-        top_team_moves = [CheckersMoves.DIAG_BOTTOM_RIGHT, CheckersMoves.DIAG_BOTTOM_LEFT,
-                          CheckersMoves.CAPTURE_BOTTOM_RIGHT, CheckersMoves.CAPTURE_BOTTOM_LEFT]
-
-        curr_turn_pieces: list[CheckersPiece] = []
-        cloned_board = self.clone_board()
-        for each_board_row in cloned_board:
-            for each_board_tile in each_board_row:
-
-                # current piece owner is the current turn's player
-                if each_board_tile.piece is not None and each_board_tile.piece.owner == self.turn:
-                    curr_turn_pieces.append(each_board_tile.piece)
-
-        potential_moves: list[CheckersMove] = []
-        for each_owner_piece in curr_turn_pieces:
-            x = each_owner_piece.x
-            y = each_owner_piece.y
-            rightx_ind, leftx_ind, upy_ind, downy_ind, capture_rightx_ind, capture_leftx_ind, capture_upy_ind, capture_downy_ind = x + \
-                1, x - 1, y - 1, y + 1, x + 2, x - 2, y - 2, y + 2
-            diag_ur_ind, diag_ul_ind, diag_dr_ind, diag_dl_ind, capture_ur_ind, capture_ul_ind, capture_dr_ind, capture_dl_ind = (rightx_ind, upy_ind), (leftx_ind, upy_ind), (rightx_ind, downy_ind), (
-                leftx_ind, downy_ind), (capture_rightx_ind, capture_upy_ind), (capture_leftx_ind, capture_upy_ind), (capture_rightx_ind, capture_downy_ind), (capture_leftx_ind, capture_downy_ind)
-
-            top_team_coords = [diag_dr_ind, diag_dl_ind,
-                               capture_dr_ind, capture_dl_ind]
-            bottom_team_coords = [diag_ur_ind,
-                                  diag_ul_ind, capture_ur_ind, capture_ul_ind]
-
-            is_bottom_team = each_owner_piece.owner == CheckersPlayer.BOTTOM
-            move_types = bottom_team_moves if is_bottom_team else top_team_moves
-
-            if each_owner_piece.is_king:
-                # can move both directions
-                move_types.extend(
-                    top_team_moves if is_bottom_team else bottom_team_moves)
-                if is_bottom_team:
-                    bottom_team_coords.extend(top_team_coords)
-                else:
-                    top_team_coords.extend(bottom_team_coords)
-
-            coords = bottom_team_coords if is_bottom_team else top_team_coords
-            for ind, each_move in enumerate(move_types):
-                [calc_x, calc_y] = coords[ind]
-                match each_move:
-                    case CheckersMoves.DIAG_TOP_RIGHT | CheckersMoves.DIAG_TOP_LEFT | CheckersMoves.DIAG_BOTTOM_RIGHT | CheckersMoves.DIAG_BOTTOM_LEFT:
-                        if calc_y < len(cloned_board) and calc_x < len(cloned_board[1]) and cloned_board[calc_y][calc_x].piece is None:
-                            potential_moves.append(CheckersMove(
-                                cloned_board, x, y, calc_x, calc_y))
-                    case CheckersMoves.CAPTURE_TOP_RIGHT | CheckersMoves.CAPTURE_TOP_LEFT | CheckersMoves.CAPTURE_BOTTOM_RIGHT | CheckersMoves.CAPTURE_BOTTOM_LEFT:
-                        [diag_x, diag_y] = coords[ind % 2]
-                        if calc_y < len(cloned_board) and calc_x < len(cloned_board[1]):
-                            jump_piece = cloned_board[calc_y][calc_x].piece
-                            middle_piece = cloned_board[diag_y][diag_x].piece
-                            if jump_piece is None and middle_piece is not None and middle_piece.owner is not each_owner_piece.owner:
-                                potential_moves.append(CheckersMove(
-                                    cloned_board, x, y, calc_x, calc_y, True, diag_x, diag_y))
+        # captures are mandatory, when any piece can jump only the jump sequences are returned
+        potential_moves = self.generate_captures()
+        if potential_moves:
+            self.moves = potential_moves
+            return potential_moves
+
+        geometry = self.geometry
+        square_coords = geometry.square_coords
+        occupied = self.occupied
+        own_kings = self.own_kings
+        side_steps = geometry.plain_steps[0 if self.turn ==
+                                          CheckersPlayer.BOTTOM else 1]
+
+        for each_index in iterate_bits(self.own_men | own_kings):
+            x, y = square_coords[each_index]
+            for landing in side_steps[own_kings >> each_index & 1][each_index]:
+                if not occupied >> landing & 1:
+                    to_x, to_y = square_coords[landing]
+                    potential_moves.append(
+                        CheckersMove(None, x, y, to_x, to_y))
 
         self.moves = potential_moves
         return potential_moves
 
-    def total_vulnerable_positions(self: CheckersState) -> int:
-        your_pieces = []
-        for each_board_row in self.board:
-            for each_cell in each_board_row:
-                if each_cell.piece is not None and each_cell.piece.owner == self.turn:
-                    # found your piece
-                    your_pieces.append(each_cell.piece)
+    def generate_captures(self: CheckersState) -> list[CheckersMove]:
+        """
+        Every complete jump sequence of the player to move, each one a single move, most pieces captured first. A
+        piece keeps jumping while it can, jumped pieces stay on the board until the move ends (so they can be neither
+        jumped twice nor landed on), and a man reaching the far row stops there, it has no forward jumps left
+
+        Leaves self.moves (the mobility term) alone
+
+        Returns:
+            The capturing moves, empty when no piece can jump
+        """
+        geometry = self.geometry
+        side = 0 if self.turn == CheckersPlayer.BOTTOM else 1
+        enemy_pieces = self.enemy_men | self.enemy_kings
+        own_kings = self.own_kings
+        occupied = self.occupied
+
+        captures: list[CheckersMove] = []
+        for each_index in iterate_bits(self.own_men | own_kings):
+            side_jumps = geometry.jump_steps[side][own_kings >> each_index & 1]
+            if not any(enemy_pieces >> jumped & 1 and not occupied >> landing & 1
+                       for (landing, jumped) in side_jumps[each_index]):
+                continue
+            # the jumping piece leaves its square, a sequence may pass back over it
+            self._extend_jumps(side_jumps, each_index, each_index, occupied & ~(1 << each_index), enemy_pieces, 0, [], [],
+                               captures)
+
+        if len(captures) > 1:
+            captures.sort(key=lambda x: -len(x.captured))
+        return captures
+
+    def _extend_jumps(self: CheckersState, side_jumps: list[list[tuple[int, int]]], origin: int, index: int, occupied: int, enemy_pieces: int, jumped_mask: int, path: list[int], jumped: list[int], captures: list[CheckersMove]) -> None:
+        # depth-first over the jumps available from `index`, every sequence that cannot go on becomes a move
+        extended = False
+        for (landing, each_jumped) in side_jumps[index]:
+            if occupied >> landing & 1 or not enemy_pieces >> each_jumped & 1 or jumped_mask >> each_jumped & 1:
+                continue
+            extended = True
+            self._extend_jumps(side_jumps, origin, landing, occupied, enemy_pieces, jumped_mask | 1 << each_jumped,
+                               path + [landing], jumped + [each_jumped], captures)
+
+        if not extended and path:
+            square_coords = self.geometry.square_coords
+            x, y = square_coords[origin]
+            to_x, to_y = square_coords[index]
+            captured = [square_coords[each_square] for each_square in jumped]
+            captures.append(CheckersMove(None, x, y, to_x, to_y, True, *captured[0],
+                                         [square_coords[each_square] for each_square in path], captured))
 
-        # compiled a list of your pieces, now check the diagonals
-        total_vulnerable_positions = 0
-
-        for each_piece in your_pieces:
-            total_vulnerable_positions += calculate_vulnerable_points(
-                each_piece, self)
-        return total_vulnerable_positions
+    def total_vulnerable_positions(self: CheckersState) -> int:
+        return self.vulnerable_counts[0 if self.turn == CheckersPlayer.BOTTOM else 1]
 
     def total_safe_positions(self: CheckersState) -> int:
-        your_pieces = []
-        for each_board_row in self.board:
-            for each_cell in each_board_row:
-                if each_cell.piece is not None and each_cell.piece.owner == self.turn:
-                    # found your piece
-                    your_pieces.append(each_cell.piece)
-
-        total_safe_positions = 0
-
-        for each_piece in your_pieces:
-            total_safe_positions += calculate_safe_positions(each_piece, self)
-
-        return total_safe_positions
+        return self.safe_counts[0 if self.turn == CheckersPlayer.BOTTOM else 1]
 
     def total_forced_jumps(self: CheckersState) -> int:
-        your_pieces = []
-        for each_board_row in self.board:
-            for each_cell in each_board_row:
-                if each_cell.piece is not None and each_cell.piece.owner == self.turn:
-                    # found your piece
-                    your_pieces.append(each_cell.piece)
-
-        total_jumps = 0
-
-        for each_piece in your_pieces:
-            total_jumps += is_forced_jump(each_piece, self)
-
-        return total_jumps
+        return self.forced_counts[0 if self.turn == CheckersPlayer.BOTTOM else 1]
 
     def calculate_board_control(self: CheckersState) -> int:
-        your_pieces = []
-        enemy_pieces = []
-        for each_board_row in self.board:
-            for each_cell in each_board_row:
-                if each_cell.piece is not None and each_cell.piece.owner == self.turn:
-                    # found your piece
-                    your_pieces.append(each_cell.piece)
-                elif each_cell.piece is not None:
-                    enemy_pieces.append(each_cell.piece)
-        return len(your_pieces) - len(enemy_pieces)
+        return (self.own_men | self.own_kings).bit_count() - (self.enemy_men | self.enemy_kings).bit_count()
 
     def calculate_total_pieces_heuristic(self: CheckersState) -> int:
-        your_pieces: list[CheckersPiece] = []
-        for each_board_row in self.board:
-            for each_cell in each_board_row:
-                if each_cell.piece is not None and each_cell.piece.owner == self.turn:
-                    # found your piece
-                    your_pieces.append(each_cell.piece)
-
-        total_heuristic = 0
-
-        for each_piece in your_pieces:
-            total_heuristic += each_piece.compute_heuristic_value()
-
-        return total_heuristic
+        return self.piece_values[0 if self.turn == CheckersPlayer.BOTTOM else 1]
 
+    @INSTRUMENTATION.timed('generate_heuristic')
     def generate_heuristic(self: CheckersState) -> int:
-        # Mobility (used in the board instance) DONE
-        # Threat Assessment (used in board instance)
-        # Safety (used in board instance)
-        # Forced Jumps (used in board instance)
-        # Board control (used in board instance)
+        # Every term except mobility is kept up to date by the moves themselves (see _toggle_square), so this is
+        # O(1) and can be called any number of times
 
         # Mobility
-        self.value += len(self.moves)
+        self.value = len(self.moves)
 
         # Threat Assessment
         self.value -= self.total_vulnerable_positions()
@@ -706,12 +1206,8 @@ class CheckersState:
             print(each_row)
 
     def is_winner(self: CheckersState) -> bool:
-        pieces_owners = []
-        for each_row in self.board:
-            for each_tile in each_row:
-                if each_tile.piece is not None and not each_tile.piece.owner in pieces_owners:
-                    pieces_owners.append(each_tile.piece.owner)
-        return len(pieces_owners) == 1
+        # exactly one player has pieces left
+        return (self.player_pieces(CheckersPlayer.BOTTOM) == 0) != (self.player_pieces(CheckersPlayer.TOP) == 0)
 
 
 class CheckersGraphNode(GraphNode):
@@ -724,6 +1220,7 @@ class CheckersGraphNode(GraphNode):
     Returns:
         The instantiated state
     """
+    __slots__ = ('state', 'is_winning_move')
 
     def __init__(self: CheckersGraphNode, spec: GraphNodeType, flip_spec: bool = False, state: Optional[CheckersState] = None) -> None:
         super().__init__()
@@ -736,21 +1233,20 @@ class CheckersGraphNode(GraphNode):
     def set_state(self: CheckersGraphNode, state: CheckersState) -> None:
         self.state = state
 
+    def copy_node(self: CheckersGraphNode) -> CheckersGraphNode:
+        # the copy shares the state, clone it first when it is going to be mutated
+        copied = CheckersGraphNode(self.spec, False, self.state)
+        copied._value = self._value
+        copied._cached_value = self._cached_value
+        copied.is_winning_move = self.is_winning_move
+        return copied
+
     def is_goal_state(self: CheckersGraphNode) -> bool:
         if self.state is None:
             return False
 
-        board_pieces = self.state.board
-        player_count = {}
-        for each_board_row in board_pieces:
-            for each_tile in each_board_row:
-                if each_tile.piece != None:
-                    if each_tile.piece.owner in player_count:
-                        player_count[each_tile.piece.owner] += 1
-                    else:
-                        player_count[each_tile.piece.owner] = 1
         # only 1 player left on board
-        return len(player_count.keys()) == 1
+        return self.state.is_winner()
 
     def __str__(self: CheckersGraphNode):
         str_board = []
@@ -762,17 +1258,23 @@ class CheckersGraphNode(GraphNode):
         return ''.join(str_board)
 
 
-def recursive_deepening_dfs(curr_node: CheckersGraphNode, visited_states: Optional[dict[str, int]] = None, depth_limit=6):
+@INSTRUMENTATION.timed('recursive_deepening_dfs')
+def recursive_deepening_dfs(curr_node: CheckersGraphNode, visited_states: Optional[TranspositionTable] = None, depth_limit=6):
     if visited_states is None:
-        visited_states = {}
+        visited_states = TranspositionTable()
 
-    if str(curr_node) in visited_states or curr_node.state.depth == depth_limit or curr_node.is_goal_state():
+    cached = visited_states.probe(curr_node.state.hash)
+    if cached is not None or curr_node.state.depth == depth_limit or curr_node.is_goal_state():
         is_goal = curr_node.is_goal_state()
+        # the heuristic scores the player to move, MAX nodes are the ones where that is the root's player
+        root_to_move = curr_node.spec == GraphNodeType.MAX
         curr_node.spec = GraphNodeType.TERMINAL
         curr_node.is_winning_move = is_goal
-        curr_node.value = curr_node.state.generate_heuristic() if str(
-            curr_node) not in visited_states else visited_states[str(curr_node)]
-        visited_states[str(curr_node)] = curr_node.value
+        heuristic = quiescence(curr_node.state, float('-inf'), float(
+            'inf')) if cached is None else cached[2]
+        curr_node.value = heuristic if root_to_move else -heuristic
+        visited_states.store(curr_node.state.hash, 0,
+                             TTBound.EXACT, heuristic)
         return curr_node
 
     curr_node.state.generate_potential_moves()
@@ -788,30 +1290,99 @@ def recursive_deepening_dfs(curr_node: CheckersGraphNode, visited_states: Option
     curr_node.add_children(children)
 
     for each_recur_child in children:
-        recursive_deepening_dfs(each_recur_child, visited_states)
+        recursive_deepening_dfs(each_recur_child, visited_states, depth_limit)
 
     return curr_node
 
 
-def alphabeta_pruning(curr_node: CheckersGraphNode, alpha=float('-inf'), beta=float('inf')) -> float:
+def build_search_arena(state: CheckersState, depth_limit: int = 6, visited_states: Optional[TranspositionTable] = None) -> tuple[GraphArena, int]:
+    """
+    Builds the same tree as recursive_deepening_dfs into a GraphArena, walking one copy of `state` with
+    make_move/unmake_move instead of keeping a CheckersState per node
+
+    Arguments:
+        state (CheckersState): The root position (left untouched)
+        depth_limit (int): The amount of plies below the root to expand
+        visited_states (Optional[TranspositionTable]): Positions already scored, these become leaves
+
+    Returns:
+        The arena and the id of its root node (MAX), node moves hold the index of the move played among the
+        generate_potential_moves of the parent position
+    """
+    arena = GraphArena()
+    root = arena.add_node(GraphNodeType.MAX)
+    curr_state = state.clone()
+    expand_arena_node(arena, root, curr_state, TranspositionTable() if visited_states is None else visited_states,
+                      curr_state.depth + depth_limit)
+    return arena, root
+
+
+def expand_arena_node(arena: GraphArena, node: int, state: CheckersState, visited_states: TranspositionTable, depth_limit: int) -> None:
+    # one recursive_deepening_dfs step, `state` is the position of `node` and is restored before returning
+    cached = visited_states.probe(state.hash)
+    if cached is not None or state.depth == depth_limit or state.is_winner():
+        root_to_move = arena.get_spec(node) == GraphNodeType.MAX
+        heuristic = quiescence(state, float('-inf'), float(
+            'inf')) if cached is None else cached[2]
+        arena.set_spec(node, GraphNodeType.TERMINAL)
+        arena.values[node] = heuristic if root_to_move else -heuristic
+        visited_states.store(state.hash, 0, TTBound.EXACT, heuristic)
+        return
+
+    # same order as sort_states_by_heuristic over process_moves
+    # the generation index identifies the move exactly, two captures can share CheckersMove.key
+    scored_moves = []
+    for (move_index, each_move) in enumerate(state.generate_potential_moves()):
+        undo = state.make_move(each_move)
+        scored_moves.append((state.generate_heuristic(), move_index, each_move))
+        state.unmake_move(undo)
+    scored_moves.sort(key=lambda x: x[0])
+
+    child_spec = GraphNodeType.MIN if arena.get_spec(
+        node) == GraphNodeType.MAX else GraphNodeType.MAX
+    children = [arena.add_node(child_spec, move=x)
+                for (_, x, _) in scored_moves]
+    arena.add_children(node, children)
+
+    for (each_child, (_, _, each_move)) in zip(children, scored_moves):
+        undo = state.make_move(each_move)
+        expand_arena_node(arena, each_child, state,
+                          visited_states, depth_limit)
+        state.unmake_move(undo)
+
+
+@INSTRUMENTATION.timed('alphabeta_pruning')
+def alphabeta_pruning(curr_node: CheckersGraphNode, alpha=float('-inf'), beta=float('inf'), ordering: Optional[MoveOrdering] = None, ply: int = 0) -> float:
+    # with `ordering`, children are tried in killer/history order and the cutoffs update it
     if curr_node.spec == GraphNodeType.TERMINAL:
         return curr_node.value
 
+    children = curr_node.children
+    if ordering is not None and len(children) > 1:
+        children = sorted(children, key=lambda x: ordering.sort_key(
+            x.state.applied_move, ply))
+
     if curr_node.spec == GraphNodeType.MAX:
         curr_value = float('-inf')
-        for each_ab_child in curr_node.children:
+        for (child_number, each_ab_child) in enumerate(children):
             curr_value = max(curr_value, alphabeta_pruning(
-                each_ab_child, alpha, beta))
+                each_ab_child, alpha, beta, ordering, ply + 1))
             if curr_value > beta:
+                if ordering is not None:
+                    ordering.record_cutoff(
+                        each_ab_child.state.applied_move, ply, 1, child_number)
                 break
             alpha = max(alpha, curr_value)
         return curr_value
 
     curr_value = float('inf')
-    for each_ab_child in curr_node.children:
+    for (child_number, each_ab_child) in enumerate(children):
         curr_value = min(curr_value, alphabeta_pruning(
-            each_ab_child, alpha, beta))
+            each_ab_child, alpha, beta, ordering, ply + 1))
         if curr_value < alpha:
+            if ordering is not None:
+                ordering.record_cutoff(
+                    each_ab_child.state.applied_move, ply, 1, child_number)
             break
         beta = min(curr_value, beta)
     return curr_value
@@ -830,6 +1401,870 @@ def is_your_turn(player_side: CheckersPlayer, state: CheckersGraphNode) -> bool:
 #######################################
 #######################################
 
+"""
+░█▀▀░█▀▀░█▀█░█▀▄░█▀▀░█░█
+░▀▀█░█▀▀░█▀█░█▀▄░█░░░█▀█
+░▀▀▀░▀▀▀░▀░▀░▀░▀░▀▀▀░▀░▀
+"""
+
+WIN_SCORE = 1_000_000
+MAX_PLY = 1_000
+MAX_SEARCH_DEPTH = 64
+# how many plies of captures quiescence plays out past the depth limit
+QUIESCENCE_DEPTH = 8
+# half-width of the first aspiration window around the previous iteration's score, doubled on every re-search
+ASPIRATION_WINDOW = 10
+
+
+class SearchTimeout(Exception):
+    """
+    Raised from inside the search when its time or node budget runs out, unwinding the unfinished iteration
+    """
+
+
+class MoveOrdering:
+    """
+    Move ordering learnt from the cutoffs of a search: two killer moves per ply (quiet moves that cut off at that ply
+    elsewhere in the tree) and a history score per from/to pair, both looked up by CheckersMove.key
+
+    Arguments:
+        self (MoveOrdering): The internal state
+        max_ply (int): The deepest ply killers are kept for
+        mode (MoveOrderingMode): The hints used, moves stay in generation order with NONE (cutoffs are still counted)
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: MoveOrdering, max_ply: int = MAX_SEARCH_DEPTH + 1, mode: MoveOrderingMode = MoveOrderingMode.HISTORY) -> None:
+        self.mode = mode
+        self.killers: list[list[int]] = [[0, 0] for _ in range(max_ply)]
+        self.history: dict[int, int] = {}
+        # cutoff statistics, first_move_cutoffs counts the cutoffs made by the first move tried
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def sort_key(self: MoveOrdering, move: CheckersMove, ply: int, pv_move_key: int = 0, tt_move_key: int = 0) -> tuple[int, int]:
+        # the previous principal variation first, then the table's move, the killers and the rest by history
+        move_key = move.key()
+        if move_key == pv_move_key:
+            return (0, 0)
+        if move_key == tt_move_key:
+            return (1, 0)
+        if move.capture:
+            # captures keep the generator's most-captured-first order
+            return (2, 0)
+        if self.mode.value >= MoveOrderingMode.KILLERS.value and ply < len(self.killers) and move_key in self.killers[ply]:
+            return (3, 0)
+        if self.mode == MoveOrderingMode.HISTORY:
+            return (4, -self.history.get(move_key, 0))
+        return (4, 0)
+
+    def order(self: MoveOrdering, moves: list[CheckersMove], ply: int, pv_move_key: int = 0, tt_move_key: int = 0) -> list[CheckersMove]:
+        # sorts `moves` in place and returns it
+        if len(moves) > 1 and self.mode != MoveOrderingMode.NONE:
+            moves.sort(key=lambda x: self.sort_key(
+                x, ply, pv_move_key, tt_move_key))
+        return moves
+
+    def record_cutoff(self: MoveOrdering, move: CheckersMove, ply: int, depth: int, move_number: int) -> None:
+        # `move` was the `move_number`th tried (from 0) and failed high with `depth` left
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        if move.capture or self.mode.value < MoveOrderingMode.KILLERS.value:
+            return
+        move_key = move.key()
+        if ply < len(self.killers) and self.killers[ply][0] != move_key:
+            self.killers[ply][1] = self.killers[ply][0]
+            self.killers[ply][0] = move_key
+        if self.mode == MoveOrderingMode.HISTORY:
+            self.history[move_key] = self.history.get(
+                move_key, 0) + depth * depth
+
+    @property
+    def first_move_cutoff_rate(self: MoveOrdering) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+
+class SearchContext:
+    """
+    Bookkeeping shared by every node of a single search
+
+    Arguments:
+        self (SearchContext): The internal state
+        table (Optional[TranspositionTable]): The transposition table to probe and fill (a new one when omitted)
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: SearchContext, table: Optional[TranspositionTable] = None) -> None:
+        self.table: TranspositionTable = table if table is not None else TranspositionTable()
+        self.nodes = 0
+        # positions scored at the horizon (handed to quiescence), and the nodes of each iterative deepening iteration
+        self.leaves = 0
+        self.iteration_nodes: list[int] = []
+        # budget, checked as the search runs (None means unlimited)
+        self.deadline: Optional[float] = None
+        self.node_limit: Optional[int] = None
+        # move keys of the previous iteration's principal variation, indexed by ply
+        self.pv_keys: list[int] = []
+        # the capture-only extension below depth 0, 0 evaluates the leaves as they are
+        self.quiescence_depth = QUIESCENCE_DEPTH
+        self.ordering = MoveOrdering()
+        # Principal Variation Search, every move after the first is tried with a null window first
+        self.pvs = False
+        # searches repeated with a wider window (PVS moves that beat alpha, aspiration windows that failed)
+        self.researches = 0
+        # exact scores for covered endgames, anything with a score(state, ply) method (translatetablebase.Tablebase)
+        self.tablebase = None
+        # scores the positions quiescence stands pat on, from the perspective of the player to move (see EVALUATORS)
+        self.evaluate: Callable[[CheckersState], float] = evaluate_state
+
+
+class SearchResult:
+    """
+    Represents the outcome of searching a root position
+
+    Arguments:
+        self (SearchResult): The internal state
+        score (float): The score of the root position, from the perspective of the player to move
+        best_move (Optional[CheckersMove]): The move to play (None when the player to move has no moves)
+        principal_variation (list[CheckersMove]): The line of play expected from both sides, starting with best_move
+        nodes (int): The amount of positions visited
+        depth (int): The depth that was searched
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: SearchResult, score: float, best_move: Optional[CheckersMove], principal_variation: list[CheckersMove], nodes: int, depth: int) -> None:
+        self.score = score
+        self.best_move = best_move
+        self.principal_variation = principal_variation
+        self.nodes = nodes
+        self.depth = depth
+        # positions scored at the horizon
+        self.leaves = 0
+        # only filled in by the tree-building debug path
+        self.tree: Optional[CheckersGraphNode] = None
+        # beta cutoffs, and how many of them the first move tried made (see MoveOrdering)
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # searches repeated with a wider window
+        self.researches = 0
+
+    @property
+    def first_move_cutoff_rate(self: SearchResult) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def __str__(self: SearchResult) -> str:
+        cutoffs = f' [Cutoffs: {self.cutoffs}, {self.first_move_cutoff_rate:.0%} on the first move]' if self.cutoffs else ''
+        return f'Depth {self.depth} [Score: {self.score}] [Nodes: {self.nodes}]{cutoffs} PV: {", ".join(str(x) for x in self.principal_variation)}'
+
+
+def score_to_table(score: float, ply: int) -> float:
+    # wins and losses are stored as distance from the position, not from the root
+    if score >= WIN_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -WIN_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def score_from_table(score: float, ply: int) -> float:
+    if score >= WIN_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -WIN_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def evaluate_state(state: CheckersState) -> float:
+    return state.generate_heuristic()
+
+
+def evaluate_material(state: CheckersState) -> float:
+    # piece values alone (kings and advanced men count for more), the player to move's minus the opponent's
+    own_side = 0 if state.turn == CheckersPlayer.BOTTOM else 1
+    return state.piece_values[own_side] - state.piece_values[1 - own_side]
+
+
+# the evaluations a search can be given by name (search_best_move/iterative_deepening `evaluator`)
+EVALUATORS: dict[str, Callable[[CheckersState], float]] = {
+    'heuristic': evaluate_state,
+    'material': evaluate_material,
+}
+
+
+@INSTRUMENTATION.timed('quiescence')
+def quiescence(state: CheckersState, alpha: float, beta: float, depth: int = QUIESCENCE_DEPTH, context: Optional[SearchContext] = None, ply: int = 0) -> float:
+    """
+    Plays out the pending captures of a leaf so it is not scored in the middle of an exchange, the player to move may
+    also stand pat on the heuristic instead of capturing
+
+    Arguments:
+        state (CheckersState): The leaf position, restored before returning
+        alpha (float): The lower bound of the window
+        beta (float): The upper bound of the window
+        depth (int): The amount of captures left to play out
+        context (Optional[SearchContext]): The search to count the capture nodes and check the budget of
+        ply (int): The distance from the root
+
+    Returns:
+        The score from the perspective of the player to move
+    """
+    if (state.own_men | state.own_kings) == 0:
+        return -WIN_SCORE + ply
+    best_score = context.evaluate(
+        state) if context is not None else evaluate_state(state)
+    if depth <= 0 or best_score >= beta:
+        return best_score
+    alpha = max(alpha, best_score)
+
+    for each_move in state.generate_captures():
+        if context is not None:
+            context.nodes += 1
+            if context.node_limit is not None and context.nodes > context.node_limit:
+                raise SearchTimeout()
+            if context.deadline is not None and context.nodes & 255 == 0 and perf_counter() >= context.deadline:
+                raise SearchTimeout()
+        undo = state.make_move(each_move)
+        score = -quiescence(state, -beta, -alpha,
+                            depth - 1, context, ply + 1)
+        state.unmake_move(undo)
+
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best_score
+
+
+@INSTRUMENTATION.timed('negamax')
+def negamax(state: CheckersState, depth: int, alpha: float, beta: float, context: SearchContext, ply: int = 0) -> tuple[float, list[CheckersMove]]:
+    """
+    Alpha-beta search in negamax form, walking the tree on the single mutable `state` with make/unmake
+
+    Children are only made one at a time, so a cutoff skips generating the remaining siblings altogether
+
+    Arguments:
+        state (CheckersState): The position to search, restored before returning
+        depth (int): The remaining depth
+        alpha (float): The lower bound of the window
+        beta (float): The upper bound of the window
+        context (SearchContext): The shared search bookkeeping
+        ply (int): The distance from the root
+
+    Returns:
+        The score from the perspective of the player to move, and the principal variation below this node
+    """
+    context.nodes += 1
+    if context.node_limit is not None and context.nodes > context.node_limit:
+        raise SearchTimeout()
+    if context.deadline is not None and context.nodes & 255 == 0 and perf_counter() >= context.deadline:
+        raise SearchTimeout()
+    table = context.table
+    alpha_original = alpha
+
+    tt_move_key = 0
+    entry = table.probe(state.hash)
+    if entry is not None:
+        entry_depth, entry_bound, entry_score, tt_move_key = entry
+        if ply > 0 and entry_depth >= depth:
+            entry_score = score_from_table(entry_score, ply)
+            if entry_bound == TTBound.EXACT \
+                    or (entry_bound == TTBound.LOWER and entry_score >= beta) \
+                    or (entry_bound == TTBound.UPPER and entry_score <= alpha):
+                return entry_score, []
+
+    if (state.own_men | state.own_kings) == 0:
+        return -WIN_SCORE + ply, []
+    if context.tablebase is not None and ply > 0:
+        tablebase_score = context.tablebase.score(state, ply)
+        if tablebase_score is not None:
+            return tablebase_score, []
+    if depth <= 0:
+        context.leaves += 1
+        return quiescence(state, alpha, beta, context.quiescence_depth, context, ply), []
+
+    moves = state.generate_potential_moves()
+    if not moves:
+        # no legal moves left, the player to move has lost
+        return -WIN_SCORE + ply, []
+
+    # previous iteration's PV move first, then the table's best move, killers and history
+    pv_move_key = context.pv_keys[ply] if ply < len(context.pv_keys) else 0
+    context.ordering.order(moves, ply, pv_move_key, tt_move_key)
+
+    best_score = float('-inf')
+    best_move = moves[0]
+    best_line: list[CheckersMove] = []
+    for (move_number, each_move) in enumerate(moves):
+        undo = state.make_move(each_move)
+        if context.pvs and move_number > 0 and alpha > float('-inf'):
+            # only prove the move is no better than alpha (scores are integers), search it fully when it is
+            score, line = negamax(state, depth - 1, -alpha - 1,
+                                  -alpha, context, ply + 1)
+            if alpha < -score < beta:
+                context.researches += 1
+                score, line = negamax(
+                    state, depth - 1, -beta, -alpha, context, ply + 1)
+        else:
+            score, line = negamax(
+                state, depth - 1, -beta, -alpha, context, ply + 1)
+        state.unmake_move(undo)
+        score = -score
+
+        if score > best_score:
+            best_score = score
+            best_move = each_move
+            if score > alpha:
+                alpha = score
+                best_line = [each_move] + line
+                if alpha >= beta:
+                    context.ordering.record_cutoff(
+                        each_move, ply, depth, move_number)
+                    break
+
+    if best_score <= alpha_original:
+        bound = TTBound.UPPER
+    elif best_score >= beta:
+        bound = TTBound.LOWER
+    else:
+        bound = TTBound.EXACT
+    table.store(state.hash, depth, bound, score_to_table(
+        best_score, ply), best_move.key())
+
+    return best_score, best_line
+
+
+def search_best_move(state: CheckersState, depth_limit: int = 6, table: Optional[TranspositionTable] = None, build_tree: bool = False, compact_tree: bool = False, pvs: bool = False, tablebase=None, evaluator: Callable[[CheckersState], float] = evaluate_state, ordering: MoveOrderingMode = MoveOrderingMode.HISTORY) -> SearchResult:
+    """
+    Finds the best move for the player to move in `state`, which is left untouched
+
+    Arguments:
+        state (CheckersState): The root position
+        depth_limit (int): The depth to search to
+        table (Optional[TranspositionTable]): A transposition table to reuse between searches
+        build_tree (bool): Builds the full CheckersGraphNode tree and runs alphabeta_pruning over it instead (slow,
+            for debugging, the tree is returned in `SearchResult.tree`)
+        compact_tree (bool): Builds that tree into a GraphArena instead of CheckersGraphNode objects
+        pvs (bool): Principal Variation Search, null windows for every move after the first
+        tablebase (Optional[Tablebase]): An endgame tablebase to take exact scores from (see SearchContext)
+        evaluator (Callable[[CheckersState], float]): Scores the leaves (see EVALUATORS)
+        ordering (MoveOrderingMode): The move ordering hints to use
+
+    Returns:
+        The search result
+    """
+    started = INSTRUMENTATION.start_search(table)
+    if build_tree:
+        result = build_search_tree(state, depth_limit, compact_tree)
+        INSTRUMENTATION.finish_search(
+            started, 'build_search_tree', depth_limit, result.nodes, result.leaves, result.cutoffs)
+        return result
+
+    context = SearchContext(table)
+    context.table.new_search()
+    context.pvs = pvs
+    context.tablebase = tablebase
+    context.evaluate = evaluator
+    context.ordering = MoveOrdering(mode=ordering)
+    score, line = negamax(state.clone(), depth_limit,
+                          float('-inf'), float('inf'), context)
+    result = SearchResult(score, line[0] if line else None,
+                          line, context.nodes, depth_limit)
+    result.leaves = context.leaves
+    result.cutoffs = context.ordering.cutoffs
+    result.first_move_cutoffs = context.ordering.first_move_cutoffs
+    result.researches = context.researches
+    INSTRUMENTATION.finish_search(started, 'search_best_move', depth_limit, context.nodes, context.leaves,
+                                  result.cutoffs, context.table)
+    return result
+
+
+def aspiration_search(state: CheckersState, depth: int, previous_score: float, context: SearchContext) -> tuple[float, list[CheckersMove]]:
+    """
+    negamax in a narrow window around the previous iteration's score, widening the side that failed (doubling each
+    time, then opening it fully) until the score lands inside
+
+    Arguments:
+        state (CheckersState): The root position, restored before returning
+        depth (int): The depth to search to
+        previous_score (float): The score of the previous iteration
+        context (SearchContext): The shared search bookkeeping
+
+    Returns:
+        The exact score and principal variation
+    """
+    if abs(previous_score) >= WIN_SCORE - MAX_PLY:
+        # decided scores jump around too much for a window
+        return negamax(state, depth, float('-inf'), float('inf'), context)
+
+    window = ASPIRATION_WINDOW
+    alpha, beta = previous_score - window, previous_score + window
+    while True:
+        score, line = negamax(state, depth, alpha, beta, context)
+        if alpha < score < beta or (alpha == float('-inf') and beta == float('inf')):
+            return score, line
+        context.researches += 1
+        window *= 2
+        if score <= alpha:
+            alpha = score - window if window <= 8 * \
+                ASPIRATION_WINDOW else float('-inf')
+        else:
+            beta = score + window if window <= 8 * \
+                ASPIRATION_WINDOW else float('inf')
+
+
+def iterative_deepening(state: CheckersState, time_budget_ms: Optional[float] = None, node_budget: Optional[int] = None, max_depth: int = MAX_SEARCH_DEPTH, table: Optional[TranspositionTable] = None, pvs: bool = False, aspiration: bool = False, tablebase=None, evaluator: Callable[[CheckersState], float] = evaluate_state, ordering: MoveOrderingMode = MoveOrderingMode.HISTORY) -> SearchResult:
+    """
+    Searches `state` to depth 1, 2, 3... until the time or node budget runs out, each iteration ordering its moves
+    with the previous iteration's principal variation and the transposition table it filled
+
+    Depth 1 always completes, so there is always a move to play
+
+    Arguments:
+        state (CheckersState): The root position (left untouched)
+        time_budget_ms (Optional[float]): The wall-clock budget in milliseconds
+        node_budget (Optional[int]): The maximum amount of positions to visit
+        max_depth (int): The deepest iteration to run
+        table (Optional[TranspositionTable]): A transposition table to reuse between searches
+        pvs (bool): Principal Variation Search, null windows for every move after the first
+        aspiration (bool): Searches each iteration after the first in a window around the previous score
+        tablebase (Optional[Tablebase]): An endgame tablebase to take exact scores from (see SearchContext)
+        evaluator (Callable[[CheckersState], float]): Scores the leaves (see EVALUATORS)
+        ordering (MoveOrderingMode): The move ordering hints to use
+
+    Returns:
+        The result of the last completed iteration, with `nodes` counting every iteration
+    """
+    started = INSTRUMENTATION.start_search(table)
+    context = SearchContext(table)
+    context.table.new_search()
+    context.pvs = pvs
+    context.tablebase = tablebase
+    context.evaluate = evaluator
+    context.ordering = MoveOrdering(mode=ordering)
+    deadline = perf_counter() + time_budget_ms / 1000 if time_budget_ms is not None else None
+    root = state.clone()
+
+    result = SearchResult(0, None, [], 0, 0)
+    for depth in range(1, max_depth + 1):
+        try:
+            if aspiration and depth > 1:
+                score, line = aspiration_search(
+                    root, depth, result.score, context)
+            else:
+                score, line = negamax(root, depth, float(
+                    '-inf'), float('inf'), context)
+        except SearchTimeout:
+            break
+        context.iteration_nodes.append(
+            context.nodes - sum(context.iteration_nodes))
+        result = SearchResult(score, line[0] if line else None,
+                              line, context.nodes, depth)
+        context.pv_keys = [x.key() for x in line]
+        # budgets only apply once there is a move to fall back on
+        context.deadline = deadline
+        context.node_limit = node_budget
+        if not line or abs(score) >= WIN_SCORE - MAX_PLY:
+            # no moves, or the game is decided within the horizon
+            break
+        if deadline is not None and perf_counter() >= deadline:
+            break
+
+    result.nodes = context.nodes
+    result.leaves = context.leaves
+    result.cutoffs = context.ordering.cutoffs
+    result.first_move_cutoffs = context.ordering.first_move_cutoffs
+    result.researches = context.researches
+    INSTRUMENTATION.finish_search(started, 'iterative_deepening', result.depth, context.nodes, context.leaves,
+                                  result.cutoffs, context.table, context.iteration_nodes)
+    return result
+
+
+def compare_search_modes(states: list[CheckersState], depth_limit: int = 6) -> dict[str, int]:
+    """
+    Searches every position to `depth_limit` with iterative deepening in each window mode, each with a fresh table
+
+    Arguments:
+        states (list[CheckersState]): The benchmark positions
+        depth_limit (int): The depth to search to
+
+    Returns:
+        The total nodes visited per mode ('full', 'pvs', 'aspiration', 'pvs+aspiration')
+    """
+    modes = {'full': (False, False), 'pvs': (True, False),
+             'aspiration': (False, True), 'pvs+aspiration': (True, True)}
+    return {name: sum(iterative_deepening(x, max_depth=depth_limit, pvs=pvs, aspiration=aspiration).nodes for x in states)
+            for (name, (pvs, aspiration)) in modes.items()}
+
+
+# best root score found so far by any worker of parallel_root_search, set by the pool initializer
+ROOT_ALPHA = None
+
+
+def _init_root_worker(shared_alpha) -> None:
+    global ROOT_ALPHA
+    ROOT_ALPHA = shared_alpha
+
+
+def _search_root_move(encoded_child: bytes, rows: int, cols: int, depth: int) -> tuple[float, bool, list[tuple], int]:
+    """
+    Worker side of parallel_root_search, searches the position after one root move
+
+    Returns:
+        (root score, whether the score is exact, the child's principal variation as move tuples, nodes visited)
+    """
+    child = CheckersState.from_bytes(encoded_child, rows, cols)
+    alpha = ROOT_ALPHA.value
+    # one below the best known score, so a move that ties it still gets an exact score (scores are whole numbers)
+    root_alpha = alpha - 1 if alpha != float('-inf') else alpha
+
+    context = SearchContext()
+    child_score, line = negamax(
+        child, depth, float('-inf'), -root_alpha, context, 1)
+    score = -child_score
+    exact = score > root_alpha
+    if exact:
+        with ROOT_ALPHA.get_lock():
+            if score > ROOT_ALPHA.value:
+                ROOT_ALPHA.value = score
+    return (score, exact, [x.to_tuple() for x in line], context.nodes)
+
+
+def parallel_root_search(state: CheckersState, depth_limit: int = 6, workers: Optional[int] = None) -> SearchResult:
+    """
+    Searches every root move of `state` in its own worker process, to a fixed depth
+
+    Workers get the encoded child position (see CheckersState.to_bytes) and share the best root score found so far, which
+    narrows the window of every move searched after it. Ties go to the earliest root move, so the chosen move is the
+    one search_best_move picks at the same depth
+
+    Arguments:
+        state (CheckersState): The root position (left untouched)
+        depth_limit (int): The depth to search to
+        workers (Optional[int]): The amount of worker processes (one per CPU when omitted, never more than the moves)
+
+    Returns:
+        The search result
+    """
+    root = state.clone()
+    moves = root.generate_potential_moves()
+    if not moves or depth_limit <= 0:
+        score, line = negamax(root, depth_limit, float(
+            '-inf'), float('inf'), SearchContext())
+        return SearchResult(score, line[0] if line else None, line, 1, depth_limit)
+
+    shared_alpha = Value('d', float('-inf'))
+    pool_size = max(1, min(workers or cpu_count(), len(moves)))
+    with ProcessPoolExecutor(max_workers=pool_size, initializer=_init_root_worker, initargs=(shared_alpha,)) as pool:
+        futures = [pool.submit(_search_root_move, root.process_move(x).to_bytes(), root.rows, root.cols, depth_limit - 1)
+                   for x in moves]
+        outcomes = [x.result() for x in futures]
+
+    best_index = -1
+    for ind, (score, exact, _, _) in enumerate(outcomes):
+        if exact and (best_index < 0 or score > outcomes[best_index][0]):
+            best_index = ind
+    if best_index < 0:
+        # only happens if every move failed low against a stale alpha, keep the highest bound
+        best_index = max(range(len(outcomes)), key=lambda x: outcomes[x][0])
+
+    best_score, _, child_line, _ = outcomes[best_index]
+    principal_variation = [moves[best_index]] + \
+        [CheckersMove(None, *x) for x in child_line]
+    return SearchResult(best_score, moves[best_index], principal_variation, 1 + sum(x[3] for x in outcomes), depth_limit)
+
+
+def build_search_tree(state: CheckersState, depth_limit: int = 6, compact: bool = False) -> SearchResult:
+    if compact:
+        return build_search_arena_tree(state, depth_limit)
+
+    root = CheckersGraphNode(GraphNodeType.MAX, False, state.clone())
+    recursive_deepening_dfs(root, TranspositionTable(),
+                            root.state.depth + depth_limit)
+
+    ordering = MoveOrdering()
+    best_score = float('-inf')
+    best_child: Optional[CheckersGraphNode] = None
+    for each_child in root.children:
+        child_score = alphabeta_pruning(
+            each_child, ordering=ordering, ply=1)
+        if child_score > best_score:
+            best_score = child_score
+            best_child = each_child
+
+    principal_variation: list[CheckersMove] = []
+    curr_node = root
+    while curr_node.children:
+        curr_value = curr_node.get_value()
+        curr_node = next(
+            x for x in curr_node.children if x.get_value() == curr_value)
+        principal_variation.append(curr_node.state.applied_move)
+
+    nodes = 0
+    leaves = 0
+    pending: list[CheckersGraphNode] = [root]
+    while pending:
+        curr_node = pending.pop()
+        nodes += 1
+        leaves += curr_node.spec == GraphNodeType.TERMINAL
+        pending.extend(curr_node.children)
+
+    result = SearchResult(best_score if best_child is not None else root.value,
+                          best_child.state.applied_move if best_child is not None else None, principal_variation, nodes, depth_limit)
+    result.tree = root
+    result.leaves = leaves
+    result.cutoffs = ordering.cutoffs
+    result.first_move_cutoffs = ordering.first_move_cutoffs
+    return result
+
+
+def build_search_arena_tree(state: CheckersState, depth_limit: int = 6) -> SearchResult:
+    # build_search_tree over a GraphArena, `SearchResult.tree` is the (arena, root id) pair
+    arena, root = build_search_arena(state, depth_limit)
+
+    best_score = float('-inf')
+    best_child = -1
+    for each_child in arena.children(root):
+        child_score = arena.alphabeta(each_child)
+        if child_score > best_score:
+            best_score = child_score
+            best_child = each_child
+
+    # the arena only keeps move indexes, replay them to get the moves back
+    principal_variation: list[CheckersMove] = []
+    curr_state = state.clone()
+    curr_node = root
+    while arena.first_children[curr_node] != -1:
+        curr_value = arena.get_value(curr_node)
+        curr_node = next(x for x in arena.children(
+            curr_node) if arena.get_value(x) == curr_value)
+        curr_move = curr_state.generate_potential_moves()[arena.moves[curr_node]]
+        curr_state.make_move(curr_move)
+        principal_variation.append(curr_move)
+
+    best_move = None if best_child < 0 else state.clone().generate_potential_moves()[arena.moves[best_child]]
+    result = SearchResult(best_score if best_child >= 0 else arena.values[root],
+                          best_move, principal_variation, len(arena), depth_limit)
+    result.tree = (arena, root)
+    result.leaves = sum(arena.get_spec(x) == GraphNodeType.TERMINAL for x in range(len(arena)))
+    return result
+
+
+# (state, moves) -> a weight per move, how likely the opponent is to play it
+OpponentPolicy = Callable[[CheckersState, list[CheckersMove]], list[float]]
+
+
+class ExpectimaxContext(SearchContext):
+    """
+    Bookkeeping of an expectimax search, the searching player maximizes and every opponent move is a chance node
+
+    Arguments:
+        self (ExpectimaxContext): The internal state
+        player (CheckersPlayer): The searching player, scores are from their perspective
+        opponent (OpponentModel): How the opponent's moves are weighted
+        temperature (float): The softmax temperature, higher flattens the distribution towards uniform
+        policy (Optional[OpponentPolicy]): The weights for OpponentModel.POLICY
+        top_k (Optional[int]): Only search the k likeliest opponent moves of each chance node (renormalized)
+        probe (bool): Star2 probing, bounds each chance node with the first reply of every child before searching it
+            (only pays off when the first replies are good, off by default)
+        score_bound (float): The bound on any score (Star1 pruning gets stronger the tighter it is)
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: ExpectimaxContext, player: CheckersPlayer, opponent: OpponentModel = OpponentModel.UNIFORM, temperature: float = 10.0, policy: Optional[OpponentPolicy] = None, top_k: Optional[int] = None, probe: bool = False, score_bound: float = WIN_SCORE) -> None:
+        super().__init__()
+        if opponent == OpponentModel.POLICY and policy is None:
+            raise ValueError('OpponentModel.POLICY needs a policy')
+        self.player = player
+        self.opponent = opponent
+        self.temperature = temperature
+        self.policy = policy
+        self.top_k = top_k
+        self.probe = probe
+        self.score_bound = score_bound
+        self.cutoffs = 0
+
+
+def opponent_distribution(state: CheckersState, moves: list[CheckersMove], context: ExpectimaxContext) -> list[float]:
+    # the probability of each of the opponent's moves, summing to 1
+    if context.opponent == OpponentModel.POLICY:
+        weights = list(context.policy(state, moves))
+    elif context.opponent == OpponentModel.SOFTMAX:
+        scores = []
+        for each_move in moves:
+            undo = state.make_move(each_move)
+            # the position is scored for the searching player (to move next), the opponent wants it low
+            scores.append(-state.generate_heuristic())
+            state.unmake_move(undo)
+        top_score = max(scores)
+        weights = [exp((x - top_score) / context.temperature)
+                   for x in scores]
+    else:
+        weights = [1.0] * len(moves)
+    total = sum(weights)
+    return [x / total for x in weights] if total > 0 else [1 / len(moves)] * len(moves)
+
+
+def chance_children(state: CheckersState, moves: list[CheckersMove], context: ExpectimaxContext) -> list[tuple[float, CheckersMove]]:
+    # (probability, move) likeliest first, cut down to the top k when sampling
+    children = sorted(zip(opponent_distribution(state, moves, context), moves),
+                      key=lambda x: -x[0])
+    if context.top_k is not None and len(children) > context.top_k:
+        children = children[:context.top_k]
+        total = sum(x[0] for x in children)
+        children = [(x / total, y) for (x, y) in children]
+    return children
+
+
+def expectimax(state: CheckersState, depth: int, alpha: float, beta: float, context: ExpectimaxContext, ply: int = 0) -> float:
+    """
+    Expectimax over make/unmake, MAX nodes for the searching player and chance nodes for the opponent, with
+    Star1/Star2 pruning at the chance nodes (the result is exact whenever it lies inside the window)
+
+    Arguments:
+        state (CheckersState): The position to search, restored before returning
+        depth (int): The remaining depth
+        alpha (float): The lower bound of the window
+        beta (float): The upper bound of the window
+        context (ExpectimaxContext): The shared search bookkeeping
+        ply (int): The distance from the root
+
+    Returns:
+        The expected score from the perspective of the searching player
+    """
+    context.nodes += 1
+    if context.node_limit is not None and context.nodes > context.node_limit:
+        raise SearchTimeout()
+    if context.deadline is not None and context.nodes & 255 == 0 and perf_counter() >= context.deadline:
+        raise SearchTimeout()
+    searching_player = state.turn == context.player
+
+    moves = state.generate_potential_moves() if (
+        state.own_men | state.own_kings) != 0 else []
+    if not moves:
+        # the player to move has lost
+        return -WIN_SCORE + ply if searching_player else WIN_SCORE - ply
+    if depth <= 0:
+        heuristic = evaluate_state(state)
+        return heuristic if searching_player else -heuristic
+
+    if searching_player:
+        best_score = float('-inf')
+        for each_move in moves:
+            undo = state.make_move(each_move)
+            try:
+                score = expectimax(state, depth - 1, max(alpha, best_score),
+                                   beta, context, ply + 1)
+            finally:
+                state.unmake_move(undo)
+            best_score = max(best_score, score)
+            if best_score >= beta:
+                context.cutoffs += 1
+                break
+        return best_score
+
+    children = chance_children(state, moves, context)
+    lower, upper = -context.score_bound, context.score_bound
+
+    # Star2, the first reply of each child is a lower bound on it, enough to fail high without a full search
+    if context.probe and depth > 1:
+        probed = 0.0
+        remaining = 1.0
+        for (probability, each_move) in children:
+            remaining -= probability
+            undo = state.make_move(each_move)
+            try:
+                probed += probability * \
+                    probe_first_reply(state, depth - 1, context, ply + 1)
+            finally:
+                state.unmake_move(undo)
+            if probed + remaining * lower >= beta:
+                context.cutoffs += 1
+                return probed + remaining * lower
+
+    # Star1, each child's window is what it would need to score for the chance node to leave (alpha, beta)
+    total = 0.0
+    remaining = 1.0
+    for (probability, each_move) in children:
+        remaining -= probability
+        child_alpha = (alpha - total - remaining * upper) / probability
+        child_beta = (beta - total - remaining * lower) / probability
+        undo = state.make_move(each_move)
+        try:
+            score = expectimax(state, depth - 1, max(child_alpha, lower),
+                               min(child_beta, upper), context, ply + 1)
+        finally:
+            state.unmake_move(undo)
+        total += probability * score
+        if score <= child_alpha:
+            context.cutoffs += 1
+            return total + remaining * upper
+        if score >= child_beta:
+            context.cutoffs += 1
+            return total + remaining * lower
+    return total
+
+
+def probe_first_reply(state: CheckersState, depth: int, context: ExpectimaxContext, ply: int) -> float:
+    # lower bound on a MAX node of the searching player, the value of its first move only
+    moves = state.generate_potential_moves() if (
+        state.own_men | state.own_kings) != 0 else []
+    if not moves or depth <= 0:
+        return expectimax(state, depth, -context.score_bound, context.score_bound, context, ply)
+    context.nodes += 1
+    undo = state.make_move(moves[0])
+    try:
+        return expectimax(state, depth - 1, -context.score_bound, context.score_bound, context, ply + 1)
+    finally:
+        state.unmake_move(undo)
+
+
+def expectimax_search(state: CheckersState, depth_limit: int = 4, opponent: OpponentModel = OpponentModel.UNIFORM, temperature: float = 10.0, policy: Optional[OpponentPolicy] = None, top_k: Optional[int] = None, probe: bool = False, score_bound: float = WIN_SCORE) -> SearchResult:
+    """
+    Finds the move with the best expected score against an opponent playing the given move distribution, `state` is
+    left untouched (see ExpectimaxContext for the arguments)
+
+    Returns:
+        The search result, its principal variation is only the best move
+    """
+    context = ExpectimaxContext(
+        state.turn, opponent, temperature, policy, top_k, probe, score_bound)
+    root = state.clone()
+    context.nodes += 1
+    best_score = float('-inf')
+    best_move: Optional[CheckersMove] = None
+    for each_move in root.generate_potential_moves():
+        undo = root.make_move(each_move)
+        score = expectimax(root, depth_limit - 1, best_score,
+                           float('inf'), context, 1)
+        root.unmake_move(undo)
+        if score > best_score:
+            best_score = score
+            best_move = each_move
+    if best_move is None:
+        best_score = -WIN_SCORE
+    return SearchResult(best_score, best_move, [best_move] if best_move is not None else [], context.nodes, depth_limit)
+
+
+"""
+░█▀▀░█▀█░█▀▄░░░█▀▀░█▀▀░█▀█░█▀▄░█▀▀░█░█
+░█▀▀░█░█░█░█░░░▀▀█░█▀▀░█▀█░█▀▄░█░░░█▀█
+░▀▀▀░▀░▀░▀▀░░░░▀▀▀░▀▀▀░▀░▀░▀░▀░▀▀▀░▀░▀
+"""
+
+#######################################
+#######################################
+
 """
 ░█▄█░█▀█░▀█▀░█▀█
 ░█░█░█▀█░░█░░█░█
@@ -857,33 +2292,67 @@ if __name__ == '__main__':
     # Adversarial network, calculates a strategy (policy) which recommends a move for the next state
     init_board(g.state)
 
-    # TODO: Figure out why it is breaking when selecting a move
-    while True:
-        recursive_deepening_dfs(g)
+    CPU_MOVE_MS_INPUT = input(
+        'CPU time per move in milliseconds (blank for 1000) >>\t')
+    cpu_move_ms = float(CPU_MOVE_MS_INPUT) if CPU_MOVE_MS_INPUT.strip() else 1000
+
+    CPU_WORKERS_INPUT = input(
+        'CPU worker processes, searches a fixed depth when above 1 (blank for 1) >>\t')
+    cpu_workers = int(CPU_WORKERS_INPUT) if CPU_WORKERS_INPUT.strip() else 1
+
+    SEARCH_DEPTH = 6
+    table = TranspositionTable()
+
+    # built by translateopeningbook.py, which only imports translatemain when building so it is safe to import here
+    OPENING_BOOK_PATH = os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), 'opening_book.bin')
+    opening_book = None
+    if os.path.exists(OPENING_BOOK_PATH):
+        from translateopeningbook import OpeningBook
+        try:
+            opening_book = OpeningBook(OPENING_BOOK_PATH)
+        except ValueError as error:
+            # e.g. written by an older version, rebuild it with translateopeningbook.py
+            print(f'Ignoring the opening book: {error}')
+        if opening_book is not None and (opening_book.rows, opening_book.cols) != (g.state.rows, g.state.cols):
+            opening_book.close()
+            opening_book = None
+
+    while not g.state.is_winner():
         if is_your_turn(chosen_side, g):
+            g.state.print_board()
+            available_moves = g.state.generate_potential_moves()
+            if not available_moves:
+                break
             moves = []
-            for ind, each_child in enumerate(g.children):
+            for ind, each_move in enumerate(available_moves):
+                # the child is searched from the opponent's point of view
+                child_result = search_best_move(
+                    g.state.process_move(each_move), SEARCH_DEPTH - 1, table)
                 moves.append(
-                    f'{ind + 1}:\t{each_child.state.applied_move_str} [Score: {alphabeta_pruning(each_child)}]')
+                    f'{ind + 1}:\t{each_move} [Score: {-child_result.score}]')
             print('\n'.join(moves))
             SELECTED_MOVE = 0
-            available_moves = list(set(range(1, len(moves) + 1)))
-            while SELECTED_MOVE not in available_moves:
+            while SELECTED_MOVE not in range(1, len(moves) + 1):
                 SELECTED_MOVE = int(input('Select a move from the list  >>  '))
-            g.state = g.parent.state.process_move(
-                g.children[SELECTED_MOVE].state.applied_move) if g.parent is not None else g.state.process_move(
-                g.children[SELECTED_MOVE].state.applied_move)
+            g.state = g.state.process_move(
+                available_moves[SELECTED_MOVE - 1])
         else:
-            # is CPUs turn, picks max
-            max_amt = float('-inf')
-            max_child: Optional[CheckersGraphNode] = None
-            for ind, each_child in enumerate(g.children):
-                val = alphabeta_pruning(each_child)
-                if val > max_amt:
-                    max_amt = val
-                    max_child = each_child
-            g.state = g.parent.state.process_move(
-                max_child.state.applied_move) if g.parent is not None else g.state.process_move(max_child.state.applied_move)
+            # is CPUs turn, plays from the book while the position is in it and picks max otherwise
+            book_key = opening_book.lookup(
+                g.state.hash, Random()) if opening_book is not None else None
+            book_move = next((x for x in g.state.generate_potential_moves()
+                              if x.route_key() == book_key), None) if book_key is not None else None
+            if book_move is not None:
+                print(f'Book move {book_move}')
+                g.state = g.state.process_move(book_move)
+                continue
+            result = parallel_root_search(g.state, SEARCH_DEPTH, cpu_workers) if cpu_workers > 1 else iterative_deepening(
+                g.state, time_budget_ms=cpu_move_ms, table=table)
+            print(result)
+            if result.best_move is None:
+                break
+            g.state = g.state.process_move(result.best_move)
 
 
 """
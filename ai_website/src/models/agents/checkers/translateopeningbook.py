@@ -0,0 +1,194 @@
+from __future__ import annotations
+import argparse
+import mmap
+import struct
+from random import Random
+from time import perf_counter
+from typing import Optional
+
+# Only the standard library at module level: the CPU branch of translatemain's `__main__` imports this module, and
+# importing translatemain back from here would load a second copy of it under its own name. The self-play builder
+# imports translatemain when it runs instead.
+
+BOOK_MAGIC = b'CKOB'
+# version 2 stores CheckersMove.route_key, version 1 stored CheckersMove.key
+BOOK_VERSION = 2
+# magic, version, rows, cols, record count
+HEADER_FORMAT = '<4sHBBQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Zobrist hash of the position (CheckersState.hash), move key (CheckersMove.route_key), weight, sorted by hash
+RECORD_FORMAT = '<QQI'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+MAX_WEIGHT = (1 << 32) - 1
+
+
+class OpeningBookBuilder:
+    """
+    Collects weighted book moves in memory until they are written out
+
+    Arguments:
+        self (OpeningBookBuilder): The internal state
+        rows (int): The # of rows in the board the positions are on
+        cols (int): The # of columns in the board the positions are on
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: OpeningBookBuilder, rows: int = 8, cols: int = 8) -> None:
+        self.rows = rows
+        self.cols = cols
+        # (position hash, move key) -> weight
+        self.entries: dict[tuple[int, int], int] = {}
+
+    def __len__(self: OpeningBookBuilder) -> int:
+        return len(self.entries)
+
+    def add(self: OpeningBookBuilder, key: int, move_key: int, weight: int = 1) -> None:
+        # the weights of a move recorded more than once add up
+        entry = (key, move_key)
+        self.entries[entry] = min(
+            self.entries.get(entry, 0) + weight, MAX_WEIGHT)
+
+    def write(self: OpeningBookBuilder, path: str) -> None:
+        # header, then one record per (position, move) sorted by hash so OpeningBook can binary search it in place
+        record = struct.Struct(RECORD_FORMAT)
+        with open(path, 'wb') as book_file:
+            book_file.write(struct.pack(HEADER_FORMAT, BOOK_MAGIC,
+                            BOOK_VERSION, self.rows, self.cols, len(self.entries)))
+            book_file.write(b''.join(record.pack(key, move_key, weight)
+                                     for ((key, move_key), weight) in sorted(self.entries.items())))
+
+
+def build_from_self_play(games: int = 40, book_plies: int = 10, depth: int = 6, exploration: float = 0.2, seed: int = 0, rows: int = 8, cols: int = 8) -> OpeningBookBuilder:
+    """
+    Plays `games` games from the initial position, searching every position of the first `book_plies` plies to
+    `depth` and recording the move found. To reach more than one line, a random move is played instead of the
+    searched one with probability `exploration`, and the games alternate which player moves first. A position reached
+    in several games adds weight to its move
+
+    Arguments:
+        games (int): The amount of games to play
+        book_plies (int): The plies of each game that go into the book
+        depth (int): The search depth of each book move
+        exploration (float): The probability of playing a random move
+        seed (int): Seeds the random moves
+        rows (int): The # of rows in the board
+        cols (int): The # of columns in the board
+
+    Returns:
+        The builder holding the recorded moves
+    """
+    from translatemain import CheckersPlayer, CheckersState, TranspositionTable, init_board, search_best_move
+
+    rng = Random(seed)
+    builder = OpeningBookBuilder(rows, cols)
+    table = TranspositionTable()
+    for game in range(games):
+        state = CheckersState(
+            rows, cols, CheckersPlayer.TOP if game % 2 == 0 else CheckersPlayer.BOTTOM)
+        init_board(state)
+        for _ in range(book_plies):
+            moves = state.generate_potential_moves()
+            if not moves:
+                break
+            result = search_best_move(state, depth, table)
+            if result.best_move is None:
+                break
+            builder.add(state.hash, result.best_move.route_key())
+            played = rng.choice(moves) if rng.random() < exploration else result.best_move
+            state = state.process_move(played)
+    return builder
+
+
+class OpeningBook:
+    """
+    Read-only view of an opening book file, memory mapped so only the pages binary search touches are read. Lookups
+    only take and return ints, the caller matches the move key against its generated moves
+
+    Arguments:
+        self (OpeningBook): The internal state
+        path (str): The file written by OpeningBookBuilder.write
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: OpeningBook, path: str) -> None:
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.count = struct.unpack_from(
+            HEADER_FORMAT, self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {BOOK_VERSION} opening book')
+        self.record = struct.Struct(RECORD_FORMAT)
+        self.hits = 0
+
+    def moves(self: OpeningBook, key: int) -> list[tuple[int, int]]:
+        # (move key, weight) of every book move of the position, empty when it is not in the book
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record.unpack_from(self.data, HEADER_SIZE + middle * RECORD_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        found: list[tuple[int, int]] = []
+        while low < self.count:
+            record_key, move_key, weight = self.record.unpack_from(
+                self.data, HEADER_SIZE + low * RECORD_SIZE)
+            if record_key != key:
+                break
+            found.append((move_key, weight))
+            low += 1
+        return found
+
+    def lookup(self: OpeningBook, key: int, rng: Optional[Random] = None) -> Optional[int]:
+        """
+        Picks a book move for a position
+
+        Arguments:
+            self (OpeningBook): The internal state
+            key (int): The position hash (CheckersState.hash)
+            rng (Optional[Random]): Picks among the book moves in proportion to their weight, the heaviest move is
+                always picked when omitted
+
+        Returns:
+            The move key (CheckersMove.route_key), None when the position is not in the book
+        """
+        found = self.moves(key)
+        if not found:
+            return None
+        self.hits += 1
+        if rng is None:
+            return max(found, key=lambda x: x[1])[0]
+        return rng.choices([x for (x, _) in found], weights=[x for (_, x) in found])[0]
+
+    def close(self: OpeningBook) -> None:
+        self.data.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Builds a checkers opening book from self-play')
+    parser.add_argument('output', help='The file to write')
+    parser.add_argument('--games', type=int, default=40)
+    parser.add_argument('--plies', type=int, default=10,
+                        help='The plies of each game that go into the book')
+    parser.add_argument('--depth', type=int, default=6,
+                        help='The search depth of each book move')
+    parser.add_argument('--exploration', type=float, default=0.2,
+                        help='The probability of playing a random move instead of the book move')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--cols', type=int, default=8)
+    arguments = parser.parse_args()
+
+    started = perf_counter()
+    built = build_from_self_play(arguments.games, arguments.plies, arguments.depth, arguments.exploration,
+                                 arguments.seed, arguments.rows, arguments.cols)
+    built.write(arguments.output)
+    print(f'{len(built)} book moves over {len({x for (x, _) in built.entries})} positions written to '
+          f'{arguments.output} in {perf_counter() - started:.1f}s')
@@ -0,0 +1,302 @@
+from __future__ import annotations
+import argparse
+import re
+from time import perf_counter
+from typing import Iterable, Iterator, Optional, TextIO
+
+from translatemain import CheckersMove, CheckersPlayer, CheckersState, init_board
+
+# PDN numbers the playable squares 1-32 from Black's side, which is BoardGeometry's index + 1 with Black as TOP.
+# Black moves first
+PDN_RESULTS = {'1-0': CheckersPlayer.TOP, '2-0': CheckersPlayer.TOP,
+               '0-1': CheckersPlayer.BOTTOM, '0-2': CheckersPlayer.BOTTOM}
+PDN_DRAWS = {'1/2-1/2', '1-1'}
+PDN_UNKNOWN_RESULT = '*'
+PDN_COLOURS = {CheckersPlayer.TOP: 'B', CheckersPlayer.BOTTOM: 'W'}
+
+HEADER_PATTERN = re.compile(r'^\s*\[(\w+)\s+"(.*)"\s*\]\s*$')
+# a move such as 11-15, 15x24 or 15x24x31, with any move strength marks after it
+MOVE_PATTERN = re.compile(r'^(\d+)((?:[-x]\d+)+)[!?]*$')
+# the "1." or "12..." numbering a move, on its own or glued to the move (1.11-15)
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+# numeric annotation glyphs, dropped from the move text
+SKIPPED_TOKEN_PATTERN = re.compile(r'^\$\d+$')
+
+
+def square_number(state: CheckersState, x: int, y: int) -> int:
+    return state.geometry.index_of(x, y) + 1
+
+
+def move_to_pdn(state: CheckersState, move: CheckersMove) -> str:
+    # 11-15 for a step, every landing square for a jump (15x24x31)
+    squares = [square_number(state, move.from_x, move.from_y)] + \
+        [square_number(state, x, y) for (x, y) in move.path]
+    return ('x' if move.captured else '-').join(str(x) for x in squares)
+
+
+def move_from_pdn(state: CheckersState, token: str) -> CheckersMove:
+    """
+    Finds the legal move of `state` a PDN move stands for. A jump written with only its ends (15x31) matches the
+    first jump sequence between those squares
+
+    Arguments:
+        state (CheckersState): The position the move is played in
+        token (str): The move, e.g. 11-15 or 15x24x31
+
+    Returns:
+        The move
+    """
+    parsed = MOVE_PATTERN.match(token)
+    if parsed is None:
+        raise ValueError(f'{token} is not a PDN move')
+    squares = [int(parsed.group(1))] + [int(x) for x in re.findall(r'\d+', parsed.group(2))]
+    for each_move in state.generate_potential_moves():
+        path = [square_number(state, x, y) for (x, y) in each_move.path]
+        if square_number(state, each_move.from_x, each_move.from_y) != squares[0] or path[-1] != squares[-1]:
+            continue
+        if len(squares) == 2 or path == squares[1:]:
+            return each_move
+    raise ValueError(f'{token} is not a legal move for {state.turn.name}')
+
+
+def state_to_fen(state: CheckersState) -> str:
+    # B:W21,22,K30:B1,2 style setup, the side to move then each side's squares with K marking kings
+    sides: list[str] = []
+    for (each_player, men, kings) in ((CheckersPlayer.BOTTOM, state.bottom_men, state.bottom_kings),
+                                      (CheckersPlayer.TOP, state.top_men, state.top_kings)):
+        squares = sorted([(x + 1, '') for x in range(state.geometry.num_squares) if men >> x & 1]
+                         + [(x + 1, 'K') for x in range(state.geometry.num_squares) if kings >> x & 1])
+        sides.append(PDN_COLOURS[each_player] +
+                     ','.join(f'{prefix}{x}' for (x, prefix) in squares))
+    return f'{PDN_COLOURS[state.turn]}:{sides[0]}:{sides[1]}'
+
+
+def state_from_fen(fen: str, rows: int = 8, cols: int = 8) -> CheckersState:
+    """
+    Builds the position of a PDN FEN tag (e.g. B:W18,24,27,28,K10,K15:B12,16,20,K22,K25,K29), square ranges such as
+    1-12 are accepted
+
+    Arguments:
+        fen (str): The setup
+        rows (int): The # of rows in the board
+        cols (int): The # of columns in the board
+
+    Returns:
+        The position
+    """
+    colours = {y: x for (x, y) in PDN_COLOURS.items()}
+    turn, *sides = fen.strip().rstrip('.').split(':')
+    if turn.upper() not in colours:
+        raise ValueError(f'{fen} does not start with the side to move')
+    state = CheckersState(rows, cols, colours[turn.upper()])
+    for each_side in filter(None, sides):
+        owner = colours.get(each_side[0].upper())
+        if owner is None:
+            raise ValueError(f'Unknown side {each_side[0]} in {fen}')
+        for each_square in filter(None, each_side[1:].split(',')):
+            is_king = each_square[0].upper() == 'K'
+            first, _, last = each_square.lstrip('Kk').partition('-')
+            for number in range(int(first), int(last or first) + 1):
+                x, y = state.geometry.square_coords[number - 1]
+                state.place_piece(x, y, owner, is_king)
+    return state
+
+
+def initial_state(rows: int = 8, cols: int = 8) -> CheckersState:
+    # the standard start, Black (TOP) to move
+    state = CheckersState(rows, cols, CheckersPlayer.TOP)
+    init_board(state)
+    return state
+
+
+class MovetextScanner:
+    """
+    Drops {comments} and (variations), which may nest, and ; comments up to the end of the line from move text fed a
+    line at a time, keeping its place across lines so a comment or variation can span several
+
+    Arguments:
+        self (MovetextScanner): The internal state
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: MovetextScanner) -> None:
+        self.depth = 0
+        self.in_comment = False
+
+    @property
+    def in_annotation(self: MovetextScanner) -> bool:
+        # inside a {comment} or a (variation), where a [header] line is only text
+        return self.in_comment or self.depth > 0
+
+    def feed(self: MovetextScanner, line: str) -> str:
+        # the text of `line` outside comments and variations
+        kept: list[str] = []
+        for each_char in line:
+            if self.in_comment:
+                self.in_comment = each_char != '}'
+            elif each_char == '{':
+                self.in_comment = True
+            elif each_char == ';':
+                break
+            elif each_char == '(':
+                self.depth += 1
+            elif each_char == ')':
+                self.depth = max(0, self.depth - 1)
+            elif self.depth == 0:
+                kept.append(each_char)
+        return ''.join(kept)
+
+
+def read_pdn_games(lines: Iterable[str]) -> Iterator[tuple[dict[str, str], list[str], str]]:
+    """
+    Splits a PDN stream into games. Each line is tokenized as it is read and a game is handed out as soon as its
+    termination marker (or the next game's headers) arrives, so an archive of any size is read in the memory of its
+    largest game. Games without headers may follow one another, separated by their termination markers alone
+
+    Arguments:
+        lines (Iterable[str]): The PDN text line by line, e.g. an open file
+
+    Returns:
+        (headers, move tokens, result) of each game, the result from the Result header or else the game termination
+        marker ('*' when neither is there)
+    """
+    scanner = MovetextScanner()
+    headers: dict[str, str] = {}
+    tokens: list[str] = []
+    for each_line in lines:
+        header = HEADER_PATTERN.match(each_line) if not scanner.in_annotation else None
+        if header is not None:
+            if tokens:
+                # headers after move text without a termination marker start the next game
+                yield headers, tokens, headers.get('Result', PDN_UNKNOWN_RESULT)
+                headers, tokens = {}, []
+            headers[header.group(1)] = header.group(2)
+            continue
+
+        for each_token in scanner.feed(each_line).split():
+            each_token = MOVE_NUMBER_PATTERN.sub('', each_token)
+            if not each_token:
+                continue
+            if each_token in PDN_RESULTS or each_token in PDN_DRAWS or each_token == PDN_UNKNOWN_RESULT:
+                result = headers.get('Result', PDN_UNKNOWN_RESULT)
+                yield headers, tokens, each_token if result == PDN_UNKNOWN_RESULT else result
+                headers, tokens = {}, []
+            elif not SKIPPED_TOKEN_PATTERN.match(each_token):
+                tokens.append(each_token)
+
+    if headers or tokens:
+        # no termination marker
+        yield headers, tokens, headers.get('Result', PDN_UNKNOWN_RESULT)
+
+
+def read_pdn_positions(lines: Iterable[str], rows: int = 8, cols: int = 8) -> Iterator[tuple[CheckersState, CheckersMove, str]]:
+    """
+    Replays every game of a PDN stream lazily, for building opening books and training sets out of archives too big to
+    load. Each position is a state of its own that is never changed afterwards, so it can be kept
+
+    Arguments:
+        lines (Iterable[str]): The PDN text line by line, e.g. an open file
+        rows (int): The # of rows in the board
+        cols (int): The # of columns in the board
+
+    Returns:
+        (position, move played in it, game result) for every move of every game, in order
+    """
+    for (game_number, (headers, tokens, result)) in enumerate(read_pdn_games(lines), 1):
+        state = state_from_fen(headers['FEN'], rows, cols) if 'FEN' in headers else initial_state(rows, cols)
+        for each_token in tokens:
+            try:
+                move = move_from_pdn(state, each_token)
+            except ValueError as error:
+                raise ValueError(f'Game {game_number}: {error}') from error
+            yield state, move, result
+            state = state.process_move(move)
+
+
+def format_pdn_game(moves: list[CheckersMove], result: str = PDN_UNKNOWN_RESULT, headers: Optional[dict[str, str]] = None, start: Optional[CheckersState] = None) -> str:
+    """
+    Writes a game as PDN, with a FEN header when it does not start from the initial position
+
+    Arguments:
+        moves (list[CheckersMove]): The moves played, in order
+        result (str): The result, '1-0' when Black (TOP) won, '0-1' when White (BOTTOM) won, '1/2-1/2' or '*'
+        headers (Optional[dict[str, str]]): Extra headers such as Event, Black and White
+        start (Optional[CheckersState]): The starting position, the initial position when omitted
+
+    Returns:
+        The game text, ending in a blank line
+    """
+    state = start.clone() if start is not None else initial_state()
+    game_headers = dict(headers or {})
+    game_headers['Result'] = result
+    if start is not None and state_to_fen(start) != state_to_fen(initial_state(start.rows, start.cols)):
+        game_headers['FEN'] = state_to_fen(start)
+
+    tokens: list[str] = []
+    move_number = 1
+    for (ind, each_move) in enumerate(moves):
+        if state.turn == CheckersPlayer.TOP:
+            tokens.append(f'{move_number}.')
+        elif ind == 0:
+            # White moves first out of a setup position
+            tokens.append(f'{move_number}...')
+        tokens.append(move_to_pdn(state, each_move))
+        if state.turn == CheckersPlayer.BOTTOM:
+            move_number += 1
+        state.make_move(each_move)
+    tokens.append(result)
+
+    # wrap the move text at 80 columns
+    lines: list[str] = [f'[{x} "{y}"]' for (x, y) in game_headers.items()] + ['']
+    line = ''
+    for each_token in tokens:
+        if line and len(line) + 1 + len(each_token) > 80:
+            lines.append(line)
+            line = ''
+        line = f'{line} {each_token}' if line else each_token
+    lines.append(line)
+    return '\n'.join(lines) + '\n\n'
+
+
+def write_pdn_games(stream: TextIO, games: Iterable[tuple[list[CheckersMove], str]], headers: Optional[dict[str, str]] = None) -> int:
+    # writes (moves, result) games one after another as they are produced, returns how many were written
+    written = 0
+    for (moves, result) in games:
+        stream.write(format_pdn_game(moves, result, headers))
+        written += 1
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Replays a PDN archive, optionally turning it into a position buffer or an opening book')
+    parser.add_argument('archive', help='The PDN file to read')
+    parser.add_argument('--positions', help='Writes every position to this encode_states buffer')
+    parser.add_argument('--book', help='Writes the moves of the first --book-plies plies to this opening book')
+    parser.add_argument('--book-plies', type=int, default=16)
+    arguments = parser.parse_args()
+
+    builder = None
+    if arguments.book:
+        from translateopeningbook import OpeningBookBuilder
+        builder = OpeningBookBuilder()
+    positions_file = open(arguments.positions, 'wb') if arguments.positions else None
+
+    started = perf_counter()
+    position_count = 0
+    with open(arguments.archive, encoding='utf-8', errors='replace') as archive:
+        for (position, played, _) in read_pdn_positions(archive):
+            position_count += 1
+            if positions_file is not None:
+                positions_file.write(position.to_bytes())
+            # every game starts at depth 1 and each move adds one
+            if builder is not None and position.depth <= arguments.book_plies:
+                builder.add(position.hash, played.route_key())
+
+    if positions_file is not None:
+        positions_file.close()
+    if builder is not None:
+        builder.write(arguments.book)
+    print(f'{position_count} positions read in {perf_counter() - started:.1f}s')
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
+from time import perf_counter
+from typing import Optional
+
+from translatemain import CheckersMove, CheckersPlayer, CheckersState, init_board
+
+# published perft of the 8x8 initial position (English draughts, captures mandatory), indexed by depth
+INITIAL_PERFT = [1, 7, 49, 302, 1469, 7361, 36768, 179740, 845931, 3963680, 18391564]
+
+
+def perft(state: CheckersState, depth: int) -> int:
+    """
+    Counts the leaf positions `depth` plies below `state` with make/unmake, the last ply is bulk counted from the
+    length of the move list without making the moves
+
+    Arguments:
+        state (CheckersState): The position, restored before returning
+        depth (int): The plies to play out
+
+    Returns:
+        The amount of leaves
+    """
+    if depth <= 0:
+        return 1
+    moves = state.generate_potential_moves()
+    if depth == 1:
+        return len(moves)
+    leaves = 0
+    for each_move in moves:
+        undo = state.make_move(each_move)
+        leaves += perft(state, depth - 1)
+        state.unmake_move(undo)
+    return leaves
+
+
+def perft_copy(state: CheckersState, depth: int) -> int:
+    # perft over process_move (a copy per child) instead of make/unmake, the two must always agree
+    if depth <= 0:
+        return 1
+    moves = state.generate_potential_moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft_copy(state.process_move(x), depth - 1) for x in moves)
+
+
+def perft_divide(state: CheckersState, depth: int) -> list[tuple[CheckersMove, int]]:
+    # perft split by root move, for narrowing a wrong count down to the move generating it
+    root = state.clone()
+    divided: list[tuple[CheckersMove, int]] = []
+    for each_move in root.generate_potential_moves():
+        undo = root.make_move(each_move)
+        divided.append((each_move, perft(root, depth - 1)))
+        root.unmake_move(undo)
+    return divided
+
+
+def _perft_worker(encoded_child: bytes, rows: int, cols: int, depth: int) -> int:
+    return perft(CheckersState.from_bytes(encoded_child, rows, cols), depth)
+
+
+def parallel_perft_divide(state: CheckersState, depth: int, workers: Optional[int] = None) -> list[tuple[CheckersMove, int]]:
+    """
+    perft_divide with every root move counted in a worker process
+
+    Arguments:
+        state (CheckersState): The position (left untouched)
+        depth (int): The plies to play out
+        workers (Optional[int]): The amount of worker processes (one per CPU when omitted)
+
+    Returns:
+        The leaves below each root move
+    """
+    root_moves = state.clone().generate_potential_moves()
+    with ProcessPoolExecutor(max_workers=max(1, workers or cpu_count())) as pool:
+        futures = [pool.submit(_perft_worker, state.process_move(x).to_bytes(), state.rows, state.cols, depth - 1)
+                   for x in root_moves]
+        return [(each_move, each_future.result()) for (each_move, each_future) in zip(root_moves, futures)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Counts the leaves of the move generation tree from the initial position')
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--divide', action='store_true',
+                        help='Prints the leaves below each root move')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Counts the root moves in this many processes')
+    parser.add_argument('--verify', action='store_true',
+                        help='Also counts with process_move and checks both counts agree')
+    parser.add_argument('--bottom-first', action='store_true',
+                        help='BOTTOM moves first instead of TOP')
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--cols', type=int, default=8)
+    arguments = parser.parse_args()
+
+    initial = CheckersState(arguments.rows, arguments.cols,
+                            CheckersPlayer.BOTTOM if arguments.bottom_first else CheckersPlayer.TOP)
+    init_board(initial)
+
+    started = perf_counter()
+    if arguments.divide or arguments.workers > 1:
+        counts = parallel_perft_divide(initial, arguments.depth, arguments.workers) if arguments.workers > 1 \
+            else perft_divide(initial, arguments.depth)
+        if arguments.divide:
+            for (root_move, root_leaves) in counts:
+                print(f'{root_move}: {root_leaves}')
+        total = sum(x for (_, x) in counts)
+    else:
+        total = perft(initial, arguments.depth)
+    elapsed = perf_counter() - started
+    print(f'perft({arguments.depth}) = {total} in {elapsed:.2f}s ({total / elapsed:.0f} leaves/s)')
+    if (arguments.rows, arguments.cols) == (8, 8) and arguments.depth < len(INITIAL_PERFT):
+        expected = INITIAL_PERFT[arguments.depth]
+        print(f'expected {expected}: {"ok" if total == expected else "MISMATCH"}')
+
+    if arguments.verify:
+        copied = perft_copy(initial, arguments.depth)
+        print(f'process_move count {copied}: {"ok" if copied == total else "MISMATCH"}')
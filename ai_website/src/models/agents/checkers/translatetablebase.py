@@ -0,0 +1,271 @@
+from __future__ import annotations
+import argparse
+import mmap
+import struct
+from array import array
+from collections import deque
+from enum import Enum
+from itertools import combinations
+from time import perf_counter
+from typing import Iterator, Optional
+
+from translatemain import WIN_SCORE, BoardGeometry, CheckersMove, CheckersPlayer, CheckersState, get_board_geometry, iterate_bits
+
+TABLEBASE_MAGIC = b'CKTB'
+TABLEBASE_VERSION = 1
+# magic, version, rows, cols, max pieces, record count
+HEADER_FORMAT = '<4sHBBBxQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Zobrist hash of the position (CheckersState.hash), distance << 2 | outcome, sorted by hash
+RECORD_FORMAT = '<QH'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+OUTCOME_BITS = 2
+OUTCOME_MASK = (1 << OUTCOME_BITS) - 1
+
+# (turn 0 BOTTOM / 1 TOP, bottom men, bottom kings, top men, top kings)
+Position = tuple[int, int, int, int, int]
+
+
+class TablebaseOutcome(Enum):
+    """
+    Represents the game theoretic result of a position for the player to move
+    """
+    DRAW = 0
+    WIN = 1
+    LOSS = 2
+
+
+def position_hash(geometry: BoardGeometry, position: Position) -> int:
+    # CheckersState.hash of the position, computed straight from the bitboards
+    turn, *bitboards = position
+    computed = geometry.zobrist_turn if turn == 1 else 0
+    for kind, bitboard in enumerate(bitboards):
+        for each_index in iterate_bits(bitboard):
+            computed ^= geometry.zobrist_pieces[kind][each_index]
+    return computed
+
+
+def enumerate_positions(geometry: BoardGeometry, max_pieces: int) -> Iterator[Position]:
+    """
+    Every position with 2 to `max_pieces` pieces where both players have at least one, men never standing on the row
+    they would have been crowned on, with either player to move
+
+    Arguments:
+        geometry (BoardGeometry): The board
+        max_pieces (int): The most pieces on the board
+
+    Returns:
+        The positions
+    """
+    squares = range(geometry.num_squares)
+    bottom_crowned, top_crowned = geometry.promotion_masks
+    for total in range(2, max_pieces + 1):
+        for bottom_count in range(1, total):
+            for bottom_squares in combinations(squares, bottom_count):
+                taken = set(bottom_squares)
+                free_squares = [x for x in squares if x not in taken]
+                for top_squares in combinations(free_squares, total - bottom_count):
+                    for bottom_kings_mask in range(1 << bottom_count):
+                        bottom_men, bottom_kings = split_kinds(
+                            bottom_squares, bottom_kings_mask)
+                        if bottom_men & bottom_crowned:
+                            continue
+                        for top_kings_mask in range(1 << len(top_squares)):
+                            top_men, top_kings = split_kinds(
+                                top_squares, top_kings_mask)
+                            if top_men & top_crowned:
+                                continue
+                            yield (0, bottom_men, bottom_kings, top_men, top_kings)
+                            yield (1, bottom_men, bottom_kings, top_men, top_kings)
+
+
+def split_kinds(squares: tuple[int, ...], kings_mask: int) -> tuple[int, int]:
+    # (men, kings) bitboards, the nth square holding a king when bit n of kings_mask is set
+    men = 0
+    kings = 0
+    for ind, each_square in enumerate(squares):
+        if kings_mask >> ind & 1:
+            kings |= 1 << each_square
+        else:
+            men |= 1 << each_square
+    return men, kings
+
+
+def child_position(geometry: BoardGeometry, position: Position, move: CheckersMove) -> Position:
+    # the position after `move`, the bitboard-only version of CheckersState.make_move
+    turn, *bitboards = position
+    own = 0 if turn == 0 else 2
+    enemy = 2 - own
+    from_index = geometry.index_of(move.from_x, move.from_y)
+    to_index = geometry.index_of(move.to_x, move.to_y)
+    is_king = bitboards[own + 1] >> from_index & 1
+    bitboards[own + is_king] &= ~(1 << from_index)
+    promoted = geometry.promotion_masks[turn] >> to_index & 1
+    bitboards[own + (is_king | promoted)] |= 1 << to_index
+    for (capture_x, capture_y) in move.captured:
+        captured_bit = 1 << geometry.index_of(capture_x, capture_y)
+        bitboards[enemy] &= ~captured_bit
+        bitboards[enemy + 1] &= ~captured_bit
+    return (1 - turn, *bitboards)
+
+
+def build_tablebase(rows: int, cols: int, max_pieces: int) -> dict[int, tuple[TablebaseOutcome, int]]:
+    """
+    Retrograde analysis of every position with up to `max_pieces` pieces: positions without moves are lost, a
+    position is won in d + 1 plies when a move leads to a loss in d, and lost in d + 1 when every move leads to a win
+    in at most d (the longest defence). Walking the positions breadth first by distance, the first win found is the
+    fastest, whatever is left unresolved is a draw
+
+    Arguments:
+        rows (int): The # of rows in the board
+        cols (int): The # of columns in the board
+        max_pieces (int): The most pieces on the board
+
+    Returns:
+        (outcome, distance in plies) for the player to move, keyed by position hash
+    """
+    geometry = get_board_geometry(rows, cols)
+    positions = list(enumerate_positions(geometry, max_pieces))
+    hashes = [position_hash(geometry, x) for x in positions]
+    ids = {x: ind for ind, x in enumerate(hashes)}
+
+    unresolved = 0
+    outcomes = bytearray(len(positions))
+    distances = array('H', bytes(2 * len(positions)))
+    remaining = array('i', bytes(4 * len(positions)))
+    parents: list[list[int]] = [[] for _ in positions]
+    lost: list[int] = []
+    captured_all: list[int] = []
+
+    scratch = CheckersState(rows, cols, CheckersPlayer.BOTTOM)
+    for (ind, position) in enumerate(positions):
+        turn, scratch.bottom_men, scratch.bottom_kings, scratch.top_men, scratch.top_kings = position
+        scratch.turn = CheckersPlayer.BOTTOM if turn == 0 else CheckersPlayer.TOP
+        moves = scratch.generate_potential_moves()
+        if not moves:
+            lost.append(ind)
+            continue
+        for each_move in moves:
+            child = child_position(geometry, position, each_move)
+            if (child[1] | child[2]) == 0 or (child[3] | child[4]) == 0:
+                # took the last enemy piece
+                captured_all.append(ind)
+                break
+            parents[ids[position_hash(geometry, child)]].append(ind)
+            remaining[ind] += 1
+
+    queue: deque[int] = deque()
+    for (outcome, distance, resolved) in ((TablebaseOutcome.LOSS, 0, lost), (TablebaseOutcome.WIN, 1, captured_all)):
+        for ind in resolved:
+            outcomes[ind] = outcome.value
+            distances[ind] = distance
+            queue.append(ind)
+
+    while queue:
+        ind = queue.popleft()
+        child_lost = outcomes[ind] == TablebaseOutcome.LOSS.value
+        for each_parent in parents[ind]:
+            if outcomes[each_parent] != unresolved:
+                continue
+            if child_lost:
+                outcomes[each_parent] = TablebaseOutcome.WIN.value
+            else:
+                remaining[each_parent] -= 1
+                if remaining[each_parent] > 0:
+                    continue
+                outcomes[each_parent] = TablebaseOutcome.LOSS.value
+            distances[each_parent] = distances[ind] + 1
+            queue.append(each_parent)
+
+    # unresolved is the same byte as DRAW
+    return {x: (TablebaseOutcome(outcomes[ind]), distances[ind]) for ind, x in enumerate(hashes)}
+
+
+def write_tablebase(path: str, rows: int, cols: int, max_pieces: int, entries: dict[int, tuple[TablebaseOutcome, int]]) -> None:
+    # header, then one record per position sorted by hash so Tablebase can binary search it in place
+    record = struct.Struct(RECORD_FORMAT)
+    with open(path, 'wb') as tablebase_file:
+        tablebase_file.write(struct.pack(HEADER_FORMAT, TABLEBASE_MAGIC, TABLEBASE_VERSION, rows, cols, max_pieces,
+                                         len(entries)))
+        tablebase_file.write(b''.join(record.pack(x, distance << OUTCOME_BITS | outcome.value)
+                                      for (x, (outcome, distance)) in sorted(entries.items())))
+
+
+class Tablebase:
+    """
+    Read-only view of a tablebase file, memory mapped so only the pages binary search touches are read
+
+    Arguments:
+        self (Tablebase): The internal state
+        path (str): The file written by write_tablebase
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: Tablebase, path: str) -> None:
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.max_pieces, self.count = struct.unpack_from(
+            HEADER_FORMAT, self.data, 0)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {TABLEBASE_VERSION} tablebase')
+        self.record = struct.Struct(RECORD_FORMAT)
+        self.hits = 0
+
+    def probe(self: Tablebase, state: CheckersState) -> Optional[tuple[TablebaseOutcome, int]]:
+        # (outcome, distance in plies) for the player to move, None when the position is not covered
+        if state.rows != self.rows or state.cols != self.cols or state.occupied.bit_count() > self.max_pieces:
+            return None
+        key = state.hash
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, packed = self.record.unpack_from(
+                self.data, HEADER_SIZE + middle * RECORD_SIZE)
+            if record_key == key:
+                self.hits += 1
+                return TablebaseOutcome(packed & OUTCOME_MASK), packed >> OUTCOME_BITS
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def score(self: Tablebase, state: CheckersState, ply: int) -> Optional[float]:
+        # the exact search score of a covered position `ply` plies from the root (see negamax)
+        found = self.probe(state)
+        if found is None:
+            return None
+        outcome, distance = found
+        if outcome == TablebaseOutcome.WIN:
+            return WIN_SCORE - ply - distance
+        if outcome == TablebaseOutcome.LOSS:
+            return -WIN_SCORE + ply + distance
+        return 0
+
+    def close(self: Tablebase) -> None:
+        self.data.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Builds a checkers endgame tablebase')
+    parser.add_argument('output', help='The file to write')
+    parser.add_argument('--pieces', type=int, default=3,
+                        help='The most pieces on the board')
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--cols', type=int, default=8)
+    arguments = parser.parse_args()
+
+    started = perf_counter()
+    built = build_tablebase(arguments.rows, arguments.cols, arguments.pieces)
+    write_tablebase(arguments.output, arguments.rows,
+                    arguments.cols, arguments.pieces, built)
+    counts = {x: 0 for x in TablebaseOutcome}
+    for (each_outcome, _) in built.values():
+        counts[each_outcome] += 1
+    print(f'{len(built)} positions ({", ".join(f"{x.name.lower()} {y}" for (x, y) in counts.items())}) '
+          f'written to {arguments.output} in {perf_counter() - started:.1f}s')
@@ -0,0 +1,267 @@
+from __future__ import annotations
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import log10
+from multiprocessing import cpu_count
+from random import Random
+from time import perf_counter
+from typing import Optional
+
+from translatemain import (EVALUATORS, MAX_SEARCH_DEPTH, CheckersPlayer, CheckersState, MoveOrderingMode, TranspositionTable,
+                           init_board, iterative_deepening)
+
+# a game still going after this many plies is scored as a draw
+MAX_GAME_PLIES = 200
+# random plies played from the initial position before the engines take over
+OPENING_PLIES = 4
+LATENCY_PERCENTILES = [50, 90, 99]
+# the Elo estimate is clamped to this score fraction (and 1 minus it) so a clean sweep stays finite
+MIN_SCORE_FRACTION = 0.01
+
+
+class EngineConfig:
+    """
+    Settings of one engine in a tournament, passed to iterative_deepening on every move
+
+    Arguments:
+        self (EngineConfig): The internal state
+        name (str): The name in the results
+        time_ms (float): The time limit per move in milliseconds
+        max_depth (int): The deepest iteration to run
+        pvs (bool): Principal Variation Search
+        aspiration (bool): Aspiration windows
+        evaluation (str): The leaf evaluation, a key of EVALUATORS
+        ordering (MoveOrderingMode): The move ordering hints
+
+    Returns:
+        Created instance
+    """
+
+    def __init__(self: EngineConfig, name: str, time_ms: float = 100, max_depth: int = MAX_SEARCH_DEPTH, pvs: bool = False, aspiration: bool = False, evaluation: str = 'heuristic', ordering: MoveOrderingMode = MoveOrderingMode.HISTORY) -> None:
+        self.name = name
+        self.time_ms = time_ms
+        self.max_depth = max_depth
+        self.pvs = pvs
+        self.aspiration = aspiration
+        # kept by name so the config pickles for the worker processes
+        self.evaluation = evaluation
+        self.ordering = ordering
+
+    @staticmethod
+    def parse(spec: str) -> EngineConfig:
+        # "name:time=100,depth=6,pvs,aspiration,eval=material,ordering=killers", every setting optional
+        name, _, settings = spec.partition(':')
+        if not name:
+            raise ValueError(f'Engine {spec} has no name')
+        config = EngineConfig(name)
+        for each_setting in filter(None, settings.split(',')):
+            setting, _, value = each_setting.partition('=')
+            match setting:
+                case 'time':
+                    # every move needs a limit, the searches run to MAX_SEARCH_DEPTH otherwise
+                    if not value or float(value) <= 0:
+                        raise ValueError(f'time needs a positive number of milliseconds in {spec}')
+                    config.time_ms = float(value)
+                case 'eval':
+                    if value not in EVALUATORS:
+                        raise ValueError(f'Unknown evaluation {value} in {spec}, one of {", ".join(EVALUATORS)}')
+                    config.evaluation = value
+                case 'ordering':
+                    modes = {x.name.lower(): x for x in MoveOrderingMode}
+                    if value not in modes:
+                        raise ValueError(f'Unknown ordering {value} in {spec}, one of {", ".join(modes)}')
+                    config.ordering = modes[value]
+                case 'depth':
+                    # depth 0 searches nothing and returns no move
+                    if not value or int(value) <= 0:
+                        raise ValueError(f'depth needs a positive number of plies in {spec}')
+                    config.max_depth = int(value)
+                case 'pvs':
+                    config.pvs = True
+                case 'aspiration':
+                    config.aspiration = True
+                case _:
+                    raise ValueError(f'Unknown engine setting {setting} in {spec}')
+        return config
+
+    def __str__(self: EngineConfig) -> str:
+        flags = ''.join(f',{x}' for x in ('pvs', 'aspiration') if getattr(self, x))
+        return f'{self.name}:time={self.time_ms},depth={self.max_depth}{flags},eval={self.evaluation},' \
+            f'ordering={self.ordering.name.lower()}'
+
+
+def random_opening(seed: int, plies: int = OPENING_PLIES, rows: int = 8, cols: int = 8) -> CheckersState:
+    # the initial position (TOP moving first) after `plies` random moves, the same for the same seed
+    rng = Random(seed)
+    state = CheckersState(rows, cols, CheckersPlayer.TOP)
+    init_board(state)
+    for _ in range(plies):
+        moves = state.generate_potential_moves()
+        if not moves:
+            break
+        state = state.process_move(rng.choice(moves))
+    return state
+
+
+def play_game(top: EngineConfig, bottom: EngineConfig, opening_seed: int, opening_plies: int = OPENING_PLIES, max_plies: int = MAX_GAME_PLIES) -> dict:
+    """
+    Plays one engine-vs-engine game from a random opening, each engine keeping its own transposition table
+
+    Arguments:
+        top (EngineConfig): The engine playing TOP
+        bottom (EngineConfig): The engine playing BOTTOM
+        opening_seed (int): Seeds the opening
+        opening_plies (int): The random plies of the opening
+        max_plies (int): The plies after which the game is a draw
+
+    Returns:
+        The winner ('TOP', 'BOTTOM' or None for a draw), the plies played, and per side the move latencies in
+        milliseconds and the nodes searched
+    """
+    state = random_opening(opening_seed, opening_plies)
+    engines = {CheckersPlayer.TOP: top, CheckersPlayer.BOTTOM: bottom}
+    tables = {x: TranspositionTable() for x in engines}
+    latencies: dict[CheckersPlayer, list[float]] = {x: [] for x in engines}
+    nodes = {x: 0 for x in engines}
+
+    winner: Optional[CheckersPlayer] = None
+    plies = 0
+    while plies < max_plies:
+        if state.is_winner() or not state.generate_potential_moves():
+            # the player to move has no pieces or no moves left
+            winner = CheckersPlayer.BOTTOM if state.turn == CheckersPlayer.TOP else CheckersPlayer.TOP
+            break
+        engine = engines[state.turn]
+        started = perf_counter()
+        result = iterative_deepening(state, time_budget_ms=engine.time_ms, max_depth=engine.max_depth,
+                                     table=tables[state.turn], pvs=engine.pvs, aspiration=engine.aspiration,
+                                     evaluator=EVALUATORS[engine.evaluation], ordering=engine.ordering)
+        latencies[state.turn].append((perf_counter() - started) * 1000)
+        nodes[state.turn] += result.nodes
+        if result.best_move is None:
+            # the search ended without a move, the game is scored as a draw
+            break
+        state = state.process_move(result.best_move)
+        plies += 1
+
+    return {'winner': winner.name if winner is not None else None, 'plies': plies,
+            'latencies_ms': {x.name: y for (x, y) in latencies.items()},
+            'nodes': {x.name: y for (x, y) in nodes.items()}}
+
+
+def elo_difference(score_fraction: float) -> float:
+    # the rating difference expected to produce `score_fraction` (wins plus half the draws, over the games)
+    clamped = min(max(score_fraction, MIN_SCORE_FRACTION), 1 - MIN_SCORE_FRACTION)
+    return -400 * log10(1 / clamped - 1)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    # nearest rank percentile, 0 for no values
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))]
+
+
+def run_match(first: EngineConfig, second: EngineConfig, games: int, workers: Optional[int] = None, seed: int = 0, opening_plies: int = OPENING_PLIES, max_plies: int = MAX_GAME_PLIES) -> dict:
+    """
+    Plays `games` games between two engines over a process pool. Each random opening is played twice, once with
+    each engine moving first, so an odd `games` is rounded up
+
+    Arguments:
+        first (EngineConfig): The engine the results are scored for
+        second (EngineConfig): Its opponent
+        games (int): The amount of games
+        workers (Optional[int]): The amount of worker processes (one per CPU when omitted)
+        seed (int): Seeds the openings
+        opening_plies (int): The random plies of each opening
+        max_plies (int): The plies after which a game is a draw
+
+    Returns:
+        Win/draw/loss of `first`, its Elo difference to `second`, and per engine the average nodes per second and
+        the move latency percentiles
+    """
+    if first.name == second.name:
+        # the per-engine results are keyed by name
+        raise ValueError(f'Both engines are named {first.name}')
+    rng = Random(seed)
+    opening_seeds = [rng.getrandbits(32) for _ in range((games + 1) // 2)]
+    pairings = [(x, first, second) for x in opening_seeds] + \
+        [(x, second, first) for x in opening_seeds]
+    with ProcessPoolExecutor(max_workers=max(1, workers or cpu_count())) as pool:
+        futures = [pool.submit(play_game, top, bottom, x, opening_plies, max_plies)
+                   for (x, top, bottom) in pairings]
+        outcomes = [x.result() for x in futures]
+
+    wins = draws = losses = 0
+    latencies: dict[str, list[float]] = {first.name: [], second.name: []}
+    nodes = {first.name: 0, second.name: 0}
+    for ((_, top, bottom), outcome) in zip(pairings, outcomes):
+        sides = {CheckersPlayer.TOP.name: top, CheckersPlayer.BOTTOM.name: bottom}
+        if outcome['winner'] is None:
+            draws += 1
+        elif sides[outcome['winner']] is first:
+            wins += 1
+        else:
+            losses += 1
+        for (side, engine) in sides.items():
+            latencies[engine.name].extend(outcome['latencies_ms'][side])
+            nodes[engine.name] += outcome['nodes'][side]
+
+    played = wins + draws + losses
+    engines = {}
+    for each_engine in (first, second):
+        engine_latencies = latencies[each_engine.name]
+        seconds = sum(engine_latencies) / 1000
+        engines[each_engine.name] = {
+            'config': str(each_engine),
+            'moves': len(engine_latencies),
+            'nodes_per_second': nodes[each_engine.name] / seconds if seconds else 0.0,
+            'latency_ms': {f'p{x}': percentile(engine_latencies, x) for x in LATENCY_PERCENTILES}}
+    return {'first': first.name, 'second': second.name, 'games': played, 'wins': wins, 'draws': draws,
+            'losses': losses, 'elo': elo_difference((wins + draws / 2) / played), 'engines': engines}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Plays engine-vs-engine checkers matches without a board UI, every pair of engines in turn')
+    parser.add_argument('--engine', action='append', required=True,
+                        help='name:time=100,depth=6,pvs,aspiration,eval=heuristic,ordering=history (give at least two, '
+                        'with different names)')
+    parser.add_argument('--games', type=int, default=20,
+                        help='The games per pair of engines')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--opening-plies', type=int, default=OPENING_PLIES)
+    parser.add_argument('--max-plies', type=int, default=MAX_GAME_PLIES)
+    parser.add_argument('--output', default='tournament.json',
+                        help='The results file')
+    arguments = parser.parse_args()
+
+    try:
+        configs = [EngineConfig.parse(x) for x in arguments.engine]
+    except ValueError as error:
+        parser.error(str(error))
+    if len(configs) < 2:
+        parser.error('a tournament needs at least two engines')
+    engine_names = [x.name for x in configs]
+    if len(set(engine_names)) != len(engine_names):
+        parser.error(f'engine names must be unique, got {", ".join(engine_names)}')
+
+    matches = []
+    for (each_first, each_second) in combinations(configs, 2):
+        match_started = perf_counter()
+        match = run_match(each_first, each_second, arguments.games, arguments.workers, arguments.seed,
+                          arguments.opening_plies, arguments.max_plies)
+        matches.append(match)
+        print(f'{match["first"]} vs {match["second"]}: +{match["wins"]} ={match["draws"]} -{match["losses"]} '
+              f'(Elo {match["elo"]:+.0f}) in {perf_counter() - match_started:.1f}s')
+        for (name, engine) in match['engines'].items():
+            print(f'\t{name}: {engine["nodes_per_second"]:.0f} nodes/s, latency '
+                  f'{", ".join(f"{x} {y:.1f}ms" for (x, y) in engine["latency_ms"].items())}')
+
+    with open(arguments.output, 'w', encoding='utf-8') as results_file:
+        json.dump({'games_per_match': arguments.games, 'seed': arguments.seed, 'matches': matches},
+                  results_file, indent=4)